@@ -0,0 +1,74 @@
+import threading
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA_DB_ALIAS = 'replica'
+
+_local = threading.local()
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def using_replica():
+    stack = getattr(_local, 'stack', None)
+    return bool(stack and stack[-1])
+
+
+class read_from_replica(ContextDecorator):
+    '''
+    Route reads made inside the decorated function or block to the read
+    replica, if one is configured. Otherwise, this is a no-op. Only use this
+    for code that never writes, e.g., the read-only API endpoints, since
+    replica reads may lag slightly behind the primary.
+
+    A single instance can wrap a view that is entered from several threads
+    at once, so keep state in a thread-local stack, not on the instance.
+    '''
+    def __enter__(self):
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+
+        _local.stack.append(replica_configured())
+
+        return self
+
+    def __exit__(self, *exc):
+        _local.stack.pop()
+        return False
+
+
+def read_connection():
+    '''
+    Return the connection raw read queries should use, honoring
+    read_from_replica.
+    '''
+    alias = REPLICA_DB_ALIAS if using_replica() else DEFAULT_DB_ALIAS
+    return connections[alias]
+
+
+class ReadReplicaRouter(object):
+    '''
+    Send ORM reads inside read_from_replica to the replica. Everything else,
+    including all writes, goes to the default database.
+    '''
+    def db_for_read(self, model, **hints):
+        if using_replica():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica mirrors the default database, so objects read from
+        # either may be related to one another.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema changes reach the replica through replication.
+        return db != REPLICA_DB_ALIAS
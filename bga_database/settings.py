@@ -43,7 +43,6 @@ INSTALLED_APPS = [
     'mailchimp_auth',
     'rest_framework',
     'extra_settings',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
@@ -51,14 +50,30 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Only load the debug toolbar for local development, so production workers
+# neither import it nor run its middleware on every request.
+if DEBUG:  # noqa
+    INSTALLED_APPS.append('debug_toolbar')
+
+    csrf_index = MIDDLEWARE.index('django.middleware.csrf.CsrfViewMiddleware')
+    MIDDLEWARE.insert(csrf_index + 1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'bga_database.urls'
 
+# Reads in the read-only API go to DATABASES['replica'], when it is defined.
+# See bga_database/routers.py.
+DATABASE_ROUTERS = ['bga_database.routers.ReadReplicaRouter']
+
+# Keep database connections open between requests, rather than connecting for
+# each one, unless local settings say otherwise.
+for database in DATABASES.values():  # noqa
+    database.setdefault('CONN_MAX_AGE', 60)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
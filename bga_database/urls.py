@@ -77,14 +77,13 @@ urlpatterns += [
 ]
 
 if settings.DEBUG:
-    from django.conf.urls import include, url
     from django.conf.urls.static import static
     from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
     import debug_toolbar
 
     urlpatterns = [
-        url(r'^__debug__/', include(debug_toolbar.urls)),
+        path('__debug__/', include(debug_toolbar.urls)),
     ] + urlpatterns
 
     urlpatterns += staticfiles_urlpatterns()
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.9 on 2026-10-15 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_import', '0008_migrate_existing_aliases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='reporting_year',
+            field=models.IntegerField(db_index=True, null=True),
+        ),
+        migrations.RunSQL('''
+            UPDATE data_import_upload AS upload
+            SET reporting_year = s_file.reporting_year
+            FROM data_import_standardizedfile AS s_file
+            WHERE s_file.upload_id = upload.id
+        ''', reverse_sql='SELECT 1'),
+    ]
@@ -7,7 +7,7 @@ from celery.task.control import inspect, revoke
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import connection, models
+from django.db import connection, models, transaction
 from django.utils.text import slugify
 from django_fsm import FSMField, transition
 
@@ -32,6 +32,12 @@ class Upload(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(get_user_model(), null=True, on_delete=models.SET(set_deleted_user))
 
+    # Reporting year of the standardized file in this upload, if any. This is
+    # copied from StandardizedFile, so records can be filtered by year without
+    # joining to standardized files. It is kept in sync by
+    # StandardizedFile.save.
+    reporting_year = models.IntegerField(null=True, db_index=True)
+
     def __str__(self):
         if self.created_by:
             return '{user} on {date}'.format(user=str(self.created_by),
@@ -147,6 +153,15 @@ class StandardizedFile(models.Model):
     def __str__(self):
         return str(self.standardized_file)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        upload = self.upload
+
+        if upload.reporting_year != self.reporting_year:
+            upload.reporting_year = self.reporting_year
+            upload.save(update_fields=['reporting_year'])
+
     @property
     def raw_table_name(self):
         return 'raw_payroll_{}'.format(self.id)
@@ -241,6 +256,12 @@ class StandardizedFile(models.Model):
         print('Deleting upload')
         self.upload.delete()
 
+        # Deleting the upload removes its salaries, so refresh the views
+        # derived from them once the deletion has been committed.
+        from payroll.models import refresh_salary_views
+
+        transaction.on_commit(refresh_salary_views)
+
         with connection.cursor() as cursor:
             for table in ('raw_payroll_{}', 'raw_person_{}', 'raw_job_{}'):
                 table_name = table.format(self.id)
@@ -7,7 +7,7 @@ import sys
 from celery import shared_task, Task
 from celery.signals import task_prerun
 from django.core.management import call_command
-from django.db import connection
+from django.db import connection, transaction
 
 from data_import.utils import CsvMeta, ImportUtility
 
@@ -114,22 +114,23 @@ def copy_to_database(self, *, s_file_id):
         cursor.execute(create)
 
     meta = CsvMeta(self.s_file.standardized_file)
-    formatted_data_file = meta.trim_extra_fields()
 
-    with open(formatted_data_file, 'r', encoding='utf-8') as f:
+    # Stream the required fields straight into the raw table, rather than
+    # writing them to a temp file and reading them back.
+    with transaction.atomic():
         with connection.cursor() as cursor:
             copy_fmt = 'COPY "{table}" ({cols}) FROM STDIN CSV HEADER'
 
             copy = copy_fmt.format(table=table_name,
                                    cols=','.join(meta.REQUIRED_FIELDS))
 
-            cursor.copy_expert(copy, f)
+            cursor.copy_expert(copy, meta.stream_required_fields())
 
             cursor.execute('CREATE INDEX ON {} (TRIM(LOWER(employer)))'.format(table_name))
 
     self.update_status('copied to database')
 
-    return 'Copied {} to database'.format(formatted_data_file)
+    return 'Copied {} to database'.format(self.s_file)
 
 
 @shared_task(bind=True, base=DataImportTask)
@@ -191,7 +192,9 @@ def insert_salaries(self, *, s_file_id):
     self.import_utility.insert_job()
     self.import_utility.insert_salary()
 
-    call_command('sync_pgviews')
+    from payroll.models import refresh_salary_views
+
+    refresh_salary_views()
 
     self.update_status('complete')
 
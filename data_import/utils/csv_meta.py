@@ -1,4 +1,6 @@
+import codecs
 import csv
+import io
 import itertools
 from os.path import basename
 
@@ -64,14 +66,32 @@ class CsvMeta(object):
     def _clean_field(cls, field):
         return '_'.join(field.strip().lower().split(' '))
 
-    def trim_extra_fields(self):
+    def _lines(self):
         '''
-        From standardized upload, grab REQUIRED_FIELDS and write them
-        to a UTF-8 temp file for copying to the database.
+        Decode the incoming file chunk by chunk and yield it one line at a
+        time, so the whole file need not be read into memory at once.
         '''
-        infile = self.file.open(mode='r')
-        lines = infile.read().decode(self.file_encoding).splitlines()
-        reader = csv.DictReader(lines)
+        remainder = ''
+
+        for chunk in codecs.iterdecode(self.file.chunks(), self.file_encoding):
+            lines = (remainder + chunk).splitlines(True)
+
+            # The last line may have been cut off at the chunk boundary.
+            # Hold it back until the next chunk comes in.
+            remainder = lines.pop() if lines else ''
+
+            for line in lines:
+                yield line.splitlines()[0]
+
+        for line in remainder.splitlines():
+            yield line
+
+    def _trimmed_lines(self):
+        '''
+        From standardized upload, grab REQUIRED_FIELDS and yield them as
+        formatted CSV lines, header first.
+        '''
+        reader = csv.DictReader(self._lines())
 
         # Downcase and underscore field names, so they will match with
         # REQUIRED_FIELDS.
@@ -80,16 +100,60 @@ class CsvMeta(object):
         # Discard header.
         next(reader)
 
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.REQUIRED_FIELDS)
+        writer.writeheader()
+
+        for row in reader:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+            out_row = {field: row[field] for field in self.REQUIRED_FIELDS}
+            writer.writerow(out_row)
+
+        yield buffer.getvalue()
+
+    def trim_extra_fields(self):
+        '''
+        From standardized upload, grab REQUIRED_FIELDS and write them
+        to a UTF-8 temp file for copying to the database.
+        '''
         outfile_name = '/tmp/{}'.format(basename(self.file.name))
 
         with open(outfile_name, 'w', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=self.REQUIRED_FIELDS)
-            writer.writeheader()
+            outfile.writelines(self._trimmed_lines())
 
-            for row in reader:
-                out_row = {field: row[field] for field in self.REQUIRED_FIELDS}
-                writer.writerow(out_row)
+        return outfile_name
 
-        infile.close()
+    def stream_required_fields(self):
+        '''
+        Return a read-only file-like object of REQUIRED_FIELDS from the
+        standardized upload, for streaming directly to the database with
+        COPY ... FROM STDIN, without writing an intermediate file.
+        '''
+        return LineStream(self._trimmed_lines())
 
-        return outfile_name
+
+class LineStream(object):
+    '''
+    Minimal file-like wrapper around an iterable of strings. Implements
+    just the read method, which is all cursor.copy_expert requires.
+    '''
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.lines)
+            except StopIteration:
+                break
+
+        if size < 0:
+            size = len(self.buffer)
+
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+
+        return chunk
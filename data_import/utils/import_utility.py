@@ -53,24 +53,33 @@ class ImportUtility(TableNamesMixin):
     def insert_responding_agency(self):
         # Unseen names mapped to an existing responding agency will have been
         # added as aliases, i.e., they will no longer appear in this select.
-        from data_import.models import RespondingAgency, RespondingAgencyAlias
-
-        select = '''
+        # Insert the new agencies and their aliases in a single statement,
+        # so the names never make a round trip through Python.
+        insert = '''
+            WITH new_agencies AS (
+              INSERT INTO data_import_respondingagency (name)
+              SELECT
+                DISTINCT TRIM(responding_agency)
+              FROM {raw_payroll} AS raw
+              LEFT JOIN data_import_respondingagencyalias AS existing
+              ON TRIM(raw.responding_agency) = TRIM(existing.name)
+              WHERE existing.name IS NULL
+              RETURNING id, name
+            )
+            INSERT INTO data_import_respondingagencyalias (
+              name,
+              preferred,
+              responding_agency_id
+            )
             SELECT
-              DISTINCT TRIM(responding_agency)
-            FROM {raw_payroll} AS raw
-            LEFT JOIN data_import_respondingagencyalias AS existing
-            ON TRIM(raw.responding_agency) = TRIM(existing.name)
-            WHERE existing.name IS NULL
+              name,
+              FALSE,
+              id
+            FROM new_agencies
         '''.format(raw_payroll=self.raw_payroll_table)
 
         with connection.cursor() as cursor:
-            cursor.execute(select)
-
-            for row in cursor:
-                name, = row
-                agency = RespondingAgency.objects.create(name=name)
-                RespondingAgencyAlias.objects.create(name=name, responding_agency=agency)
+            cursor.execute(insert)
 
         self._link_responding_agency_with_standardized_file()
 
@@ -148,6 +157,7 @@ class ImportUtility(TableNamesMixin):
         self._insert_unit_responding_agency()
         self._classify_parent_employers()
         self._insert_parent_employer_population()
+        self._classify_parent_employer_size()
 
     def _insert_unit_responding_agency(self):
         insert = '''
@@ -296,6 +306,11 @@ class ImportUtility(TableNamesMixin):
         with connection.cursor() as cursor:
             cursor.execute(insert)
 
+    def _classify_parent_employer_size(self):
+        from payroll.models import EmployerPopulation
+
+        EmployerPopulation.update_size_class()
+
     def select_unseen_child_employer(self):
         '''
         If the parent is new as of this vintage, don't force the
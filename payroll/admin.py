@@ -1,20 +1,22 @@
 from django.contrib import admin
 from django.contrib.admin.models import LogEntry
 from django.core.cache import caches, InvalidCacheBackendError
-from django.core.management import call_command
 from django.db import transaction
 
 from extra_settings.admin import SettingAdmin
 from extra_settings.models import Setting
 
+from payroll.cache import bump_data_version
 from payroll.models import Employer, EmployerUniverse, EmployerTaxonomy, \
-    Person, EmployerAlias
+    Person, EmployerAlias, EmployerPopulation, refresh_salary_views
+from payroll import tasks
 
 
 class AdminEmployer(admin.ModelAdmin):
     ordering = ('name',)
     search_fields = ('name',)
     raw_id_fields = ('parent',)
+    list_select_related = ('parent',)
     readonly_fields = ('slug', 'parent', 'vintage',)
 
     def save_model(self, request, obj, form, change):
@@ -24,15 +26,42 @@ class AdminEmployer(admin.ModelAdmin):
             if change:
                 # Get or create an alias for the given employer. Don't filter
                 # on preferred in case someone is changing the name to an alias
-                # we already have on hand.
-                alias, _ = EmployerAlias.objects.get_or_create(employer=obj, name=obj.name)
+                # we already have on hand. Saving a preferred alias marks all
+                # other aliases for the given employer as not preferred.
+                alias, created = EmployerAlias.objects.get_or_create(
+                    employer=obj,
+                    name=obj.name,
+                    defaults={'preferred': True}
+                )
 
-                # Mark the given alias as preferred, marking all other aliases
-                # for the given employer as not preferred.
-                alias.preferred = True
-                alias.save()
+                # Only write to an existing alias if it isn't preferred yet,
+                # e.g., when the name didn't change, skip the update.
+                if not created and not alias.preferred:
+                    alias.preferred = True
+                    alias.save()
 
-        call_command('build_solr_index', employer=obj.id)
+            # Size class depends on taxonomy, which may have changed.
+            EmployerPopulation.update_size_class(employer_ids=[obj.id])
+
+        # The admin wraps the change view in a transaction. Reindex once it
+        # has been committed, so the worker sees the saved employer.
+        transaction.on_commit(
+            lambda: tasks.reindex_employer.delay(employer_id=obj.id)
+        )
+
+        # Likewise, invalidate API ETags once the edit is visible.
+        transaction.on_commit(bump_data_version)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+
+        # Deleting employers removes their salaries, so refresh the views
+        # derived from them once the deletion has been committed.
+        transaction.on_commit(refresh_salary_views)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(refresh_salary_views)
 
 
 class AdminEmployerUniverse(admin.ModelAdmin):
@@ -40,7 +69,13 @@ class AdminEmployerUniverse(admin.ModelAdmin):
 
 
 class AdminEmployerTaxonomy(admin.ModelAdmin):
-    pass
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+
+            if change:
+                employer_ids = obj.employers.values_list('id', flat=True)
+                EmployerPopulation.update_size_class(employer_ids=employer_ids)
 
 
 class LogEntryAdmin(admin.ModelAdmin):
@@ -72,6 +107,23 @@ class PersonAdmin(admin.ModelAdmin):
     def most_recent_job(self, obj):
         return obj.most_recent_job
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        # Invalidate API ETags, e.g., after changing noindex.
+        transaction.on_commit(bump_data_version)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+
+        # Deleting people removes their salaries, so refresh the views
+        # derived from them once the deletion has been committed.
+        transaction.on_commit(refresh_salary_views)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(refresh_salary_views)
+
 
 class PayrollSettingAdmin(SettingAdmin):
     def save_model(self, request, obj, form, change):
@@ -1,18 +1,52 @@
+import hashlib
+
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 
+from bga_database.routers import read_from_replica
+
+from payroll.cache import get_data_version
 from payroll.models import Unit, Department, Person
 from payroll import serializers
 
 
+def data_year_etag(request, slug=None):
+    '''
+    Entity payloads only change when the data changes, so derive the ETag
+    from the requested entity and year, plus the current data version, which
+    imports and admin edits bump once they are complete. Clients sending a
+    matching If-None-Match get a 304 without the serializer running.
+
+    Without a working cache, e.g., with the dummy cache, there is no version
+    to tell when the data changed, so send no ETag at all.
+    '''
+    data_year = request.GET.get('data_year')
+
+    if not data_year:
+        return None
+
+    version = get_data_version()
+
+    if version is None:
+        return None
+
+    key = '{slug}:{data_year}:{version}'.format(slug=slug,
+                                                data_year=data_year,
+                                                version=version)
+
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
 class IndexViewSet(viewsets.ViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = serializers.IndexSerializer
 
+    @method_decorator(read_from_replica())
     @method_decorator(cache_page(60 * 60 * 72, cache='api'))
     def list(self, request):
         try:
@@ -28,6 +62,10 @@ class ReadOnlyModelViewSetWithDataYear(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     lookup_field = 'slug'
 
+    # Read the data version for the ETag from the primary. A database cache
+    # writes it there, so reading it back from the replica may miss it.
+    @method_decorator(condition(etag_func=data_year_etag))
+    @method_decorator(read_from_replica())
     @method_decorator(cache_page(60 * 60 * 72, cache='api'))
     def retrieve(self, request, slug=None):
         try:
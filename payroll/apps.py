@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PayrollConfig(AppConfig):
     name = 'payroll'
+
+    def ready(self):
+        # Connect the signals that clear the reference table caches.
+        from payroll import cache  # noqa
@@ -0,0 +1,104 @@
+'''
+Process and shared caches for payroll data.
+
+Taxonomies and universes are small reference tables that rarely change, so
+keep them in memory for the life of the process, rather than looking them up
+for each employer. Saving or deleting either, or flushing the cache, clears
+the cache in the process that made the change. Other processes, e.g., other
+web workers, discard their copy once it is PROCESS_CACHE_TIMEOUT seconds
+old, so they see changes within that window without a query per lookup.
+
+The data version identifies the current state of the payroll data, for
+deriving ETags. It lives in the shared cache, so every process sees the same
+version. Bump it whenever the data changes, e.g., at the end of an import.
+Flushing the cache also discards it, so a new version is issued afterward.
+Caches that do not store anything, e.g., the dummy cache, have no version.
+'''
+import time
+import uuid
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+DATA_VERSION_KEY = 'payroll_data_version'
+
+PROCESS_CACHE_TIMEOUT = 60 * 5
+
+_process_cache_cleared_at = time.monotonic()
+
+
+def get_data_version():
+    version = cache.get(DATA_VERSION_KEY)
+
+    if version is None:
+        # Only the first process to get here sets the version, so
+        # concurrent requests agree on it.
+        cache.add(DATA_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+
+    return version
+
+
+def bump_data_version():
+    cache.set(DATA_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def clear_process_cache():
+    global _process_cache_cleared_at
+
+    _get_taxonomy.cache_clear()
+    _get_universe.cache_clear()
+
+    _process_cache_cleared_at = time.monotonic()
+
+
+def _expire_process_cache():
+    if time.monotonic() - _process_cache_cleared_at > PROCESS_CACHE_TIMEOUT:
+        clear_process_cache()
+
+
+def get_taxonomy(taxonomy_id):
+    _expire_process_cache()
+    return _get_taxonomy(taxonomy_id)
+
+
+def get_universe(universe_id):
+    _expire_process_cache()
+    return _get_universe(universe_id)
+
+
+@lru_cache(maxsize=None)
+def _get_taxonomy(taxonomy_id):
+    from payroll.models import EmployerTaxonomy
+
+    if taxonomy_id is None:
+        return None
+
+    return EmployerTaxonomy.objects.get(id=taxonomy_id)
+
+
+@lru_cache(maxsize=None)
+def _get_universe(universe_id):
+    from payroll.models import EmployerUniverse
+
+    if universe_id is None:
+        return None
+
+    return EmployerUniverse.objects.get(id=universe_id)
+
+
+@receiver(post_save, sender='payroll.EmployerTaxonomy')
+@receiver(post_delete, sender='payroll.EmployerTaxonomy')
+def clear_taxonomy_cache(sender, **kwargs):
+    _get_taxonomy.cache_clear()
+    bump_data_version()
+
+
+@receiver(post_save, sender='payroll.EmployerUniverse')
+@receiver(post_delete, sender='payroll.EmployerUniverse')
+def clear_universe_cache(sender, **kwargs):
+    _get_universe.cache_clear()
+    bump_data_version()
@@ -12,7 +12,9 @@ class ChartHelperMixin(object):
         return BAR_DEFAULT
 
     def bin_salary_data(self, data, **kwargs):
-        float_data = np.asarray(data, dtype='float')
+        # Build the array directly from the given iterable, so salaries can be
+        # streamed from the database rather than first collected in a list.
+        float_data = np.fromiter(data, dtype='float')
         max_value = np.amax(float_data)
 
         bin_size = DISTRIBUTION_MAX / DISTRIBUTION_BIN_NUM
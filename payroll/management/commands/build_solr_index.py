@@ -1,12 +1,12 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
 import pysolr
 
 from django.conf import settings
 
 from data_import.models import StandardizedFile
-from payroll.models import Employer, Person, Salary
+from payroll.cache import get_universe
+from payroll.models import Employer, EmployerPopulation, Person, Salary
 
 
 class Command(BaseCommand):
@@ -17,6 +17,10 @@ class Command(BaseCommand):
 
         self.searcher = pysolr.Solr(settings.SOLR_URL)
 
+        # Size classes of units, keyed by ID. When indexing all units, these
+        # are looked up at once, rather than once per unit.
+        self.size_classes = {}
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--entity-types',
@@ -106,14 +110,14 @@ class Command(BaseCommand):
         of_unit = Q(job__position__employer=unit) | Q(job__position__employer__parent=unit)
 
         for year in self.reporting_years:
-            in_year = Q(vintage__standardized_file__reporting_year=year)
+            in_year = Q(vintage__reporting_year=year)
 
             salaries = Salary.objects.filter(of_unit & in_year)
             headcount = salaries.count()
 
             if headcount:
                 expenditure = salaries.aggregate(
-                    expenditure=Sum(Coalesce('amount', 0)) + Sum(Coalesce('extra_pay', 0))
+                    expenditure=Sum('total_pay')
                 )['expenditure']
 
                 document = {
@@ -123,7 +127,7 @@ class Command(BaseCommand):
                     'entity_type': 'Employer',
                     'year': year,
                     'taxonomy_s': taxonomy,
-                    'size_class_s': unit.size_class,
+                    'size_class_s': self._size_class(unit),
                     'expenditure_d': expenditure,
                     'headcount_i': headcount,
                     'text': name,
@@ -131,6 +135,12 @@ class Command(BaseCommand):
 
                 yield document
 
+    def _size_class(self, unit):
+        if unit.id in self.size_classes:
+            return self.size_classes[unit.id]
+
+        return unit.size_class
+
     def index_units(self):
         if self.recreate:
             message = 'Dropping units from {} from index'.format(
@@ -139,7 +149,7 @@ class Command(BaseCommand):
             self.stdout.write(message)
 
             search_string = self._make_search_string('id:unit*')
-            self.searcher.delete(q=search_string)
+            self.searcher.delete(q=search_string, commit=False)
 
             self.stdout.write(self.style.SUCCESS('Units dropped from index'))
 
@@ -148,21 +158,38 @@ class Command(BaseCommand):
         documents = []
         document_count = 0
 
-        units = Employer.objects.filter(parent_id__isnull=True)
+        # Each unit document includes the taxonomy, so select it up front.
+        units = Employer.objects.filter(parent_id__isnull=True)\
+                                .select_related('taxonomy')
+
+        unit_ids = list(units.values_list('id', flat=True))
+        populations = EmployerPopulation.closest_for(unit_ids)
+
+        self.size_classes = {
+            unit_id: populations[unit_id].size_class if unit_id in populations else None
+            for unit_id in unit_ids
+        }
+
+        # Solr commits are expensive. Send documents in chunks without
+        # committing, then commit once, after everything has been added.
+        # This also keeps dropped documents visible until their replacements
+        # are ready.
 
-        for unit in units:
+        for unit in units.iterator(chunk_size=2000):
             for document in self._make_unit_index(unit):
                 documents.append(document)
 
                 if len(documents) == self.chunksize:
-                    self.searcher.add(documents)
+                    self.searcher.add(documents, commit=False)
                     document_count += len(documents)
                     documents = []
 
         if documents:
-            self.searcher.add(documents)
+            self.searcher.add(documents, commit=False)
             document_count += len(documents)
 
+        self.searcher.commit()
+
         success_message = 'Added {0} documents for {1} units to the index'.format(document_count,
                                                                                   units.count())
 
@@ -174,14 +201,14 @@ class Command(BaseCommand):
         of_department = Q(job__position__employer=department)
 
         for year in self.reporting_years:
-            in_year = Q(vintage__standardized_file__reporting_year=year)
+            in_year = Q(vintage__reporting_year=year)
 
             salaries = Salary.objects.filter(of_department & in_year)
             headcount = salaries.count()
 
             if headcount:
                 expenditure = salaries.aggregate(
-                    expenditure=Sum(Coalesce('amount', 0)) + Sum(Coalesce('extra_pay', 0))
+                    expenditure=Sum('total_pay')
                 )['expenditure']
 
                 document = {
@@ -196,8 +223,8 @@ class Command(BaseCommand):
                     'text': name,
                 }
 
-                if department.universe:
-                    document['universe_s'] = str(department.universe)
+                if department.universe_id:
+                    document['universe_s'] = str(get_universe(department.universe_id))
 
                 yield document
 
@@ -209,7 +236,7 @@ class Command(BaseCommand):
             self.stdout.write(message)
 
             search_string = self._make_search_string('id:department*')
-            self.searcher.delete(q=search_string)
+            self.searcher.delete(q=search_string, commit=False)
 
             self.stdout.write(self.style.SUCCESS('Departments dropped from index'))
 
@@ -218,21 +245,24 @@ class Command(BaseCommand):
         documents = []
         document_count = 0
 
-        departments = Employer.objects.filter(parent_id__isnull=False)
+        departments = Employer.objects.filter(parent_id__isnull=False)\
+                                      .select_related('parent', 'universe')
 
-        for department in departments:
+        for department in departments.iterator(chunk_size=2000):
             for document in self._make_department_index(department):
                 documents.append(document)
 
                 if len(documents) == self.chunksize:
-                    self.searcher.add(documents)
+                    self.searcher.add(documents, commit=False)
                     document_count += len(documents)
                     documents = []
 
         if documents:
-            self.searcher.add(documents)
+            self.searcher.add(documents, commit=False)
             document_count += len(documents)
 
+        self.searcher.commit()
+
         success_message = 'Added {0} documents for {1} departments to the index'.format(document_count,
                                                                                         departments.count())
 
@@ -244,7 +274,7 @@ class Command(BaseCommand):
         for year in self.reporting_years:
             try:
                 salary = Salary.objects.filter(
-                    vintage__standardized_file__reporting_year=year,
+                    vintage__reporting_year=year,
                     job__person=person
                 ).select_related(
                     'job__position',
@@ -276,7 +306,7 @@ class Command(BaseCommand):
                 'entity_type': 'Person',
                 'year': year,
                 'title_s': job.position.title,
-                'salary_d': (salary.amount or 0) + (salary.extra_pay or 0),
+                'salary_d': salary.total_pay,
                 'employer_ss': employer_slug,
                 'text': text,
             }
@@ -291,7 +321,7 @@ class Command(BaseCommand):
             self.stdout.write(message)
 
             search_string = self._make_search_string('id:person*')
-            self.searcher.delete(q=search_string)
+            self.searcher.delete(q=search_string, commit=False)
 
             self.stdout.write(self.style.SUCCESS('People dropped from index'))
 
@@ -304,23 +334,25 @@ class Command(BaseCommand):
         # because a person can have multiple jobs and salaries, which will
         # cause them to appear more than once in this queryset.
         people = Person.objects.filter(
-            jobs__salaries__vintage__standardized_file__reporting_year__in=self.reporting_years
+            jobs__salaries__vintage__reporting_year__in=self.reporting_years
         ).distinct()
 
-        for person in people.iterator():
+        for person in people.iterator(chunk_size=2000):
             for document in self._make_person_index(person):
                 documents.append(document)
 
                 if len(documents) == self.chunksize:
-                    self.searcher.add(documents)
+                    self.searcher.add(documents, commit=False)
                     document_count += len(documents)
                     documents = []
                     self.stdout.write('Indexed {}'.format(document_count))
 
         if documents:
-            self.searcher.add(documents)
+            self.searcher.add(documents, commit=False)
             document_count += len(documents)
 
+        self.searcher.commit()
+
         success_message = 'Added {0} documents to the index'.format(document_count)
 
         self.stdout.write(self.style.SUCCESS(success_message))
@@ -349,7 +381,7 @@ class Command(BaseCommand):
         index_id = '{type}.{id}*'.format(**id_kwargs)
 
         self.stdout.write('Dropping {} from index'.format(update_object))
-        self.searcher.delete(q=index_id)
+        self.searcher.delete(q=index_id, commit=False)
         self.stdout.write(self.style.SUCCESS('{} dropped from index'.format(update_object)))
 
         documents = []
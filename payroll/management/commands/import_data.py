@@ -13,7 +13,7 @@ from data_import.models import Upload, StandardizedFile
 from data_import.tasks import copy_to_database
 from data_import.utils import ImportUtility, CsvMeta
 
-from payroll.models import Unit, Job, Department, Person
+from payroll.models import Unit, Job, Department, Person, refresh_salary_views
 
 
 class Command(BaseCommand):
@@ -216,9 +216,9 @@ class Command(BaseCommand):
             summary = people.delete()
             self.stdout.write('People deletion summary: {}'.format(summary))
 
-        call_command('sync_pgviews')
+        refresh_salary_views()
 
-        self.stdout.write('Synced pg_views for standardized file {}'.format(s_file.id))
+        self.stdout.write('Refreshed pg_views for standardized file {}'.format(s_file.id))
 
         if self.update_index:
             call_command(
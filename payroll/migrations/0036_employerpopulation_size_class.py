@@ -0,0 +1,51 @@
+# Generated by Django 2.2.9 on 2026-10-15 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0035_reflect_aliases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employerpopulation',
+            name='size_class',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        # Classify existing populations. Size class bounds are in thousands,
+        # and mirror payroll.models._SIZE_CLASS_BOUNDS at the time of writing.
+        migrations.RunSQL('''
+            UPDATE payroll_employerpopulation AS pop
+            SET size_class = classified.size_class
+            FROM (
+              SELECT
+                pop.id,
+                CASE
+                  WHEN bounds.entity_type IS NULL OR pop.population = 0 THEN NULL
+                  WHEN pop.population >= bounds.upper_bound * 1000 THEN 'Large'
+                  WHEN pop.population >= bounds.lower_bound * 1000 THEN 'Medium'
+                  ELSE 'Small'
+                END AS size_class
+              FROM payroll_employerpopulation AS pop
+              JOIN payroll_employer AS employer
+                ON pop.employer_id = employer.id
+              LEFT JOIN payroll_employertaxonomy AS taxonomy
+                ON employer.taxonomy_id = taxonomy.id
+              LEFT JOIN (
+                VALUES
+                  ('Municipal', TRUE, -1, -1),
+                  ('Municipal', FALSE, 10, 50),
+                  ('County', TRUE, 500, 1000),
+                  ('County', FALSE, 25, 75),
+                  ('Township', TRUE, 25, 100),
+                  ('Township', FALSE, 10, 50)
+              ) AS bounds (entity_type, is_special, lower_bound, upper_bound)
+                ON taxonomy.entity_type = bounds.entity_type
+                AND (taxonomy.chicago OR taxonomy.cook_or_collar) = bounds.is_special
+            ) AS classified
+            WHERE pop.id = classified.id
+        ''', reverse_sql='SELECT 1'),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.9 on 2026-10-15 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0036_employerpopulation_size_class'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employerpopulation',
+            index=models.Index(fields=['employer', 'data_year'], name='payroll_pop_employer_year_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.9 on 2026-10-15 15:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0037_employerpopulation_employer_year_index'),
+    ]
+
+    operations = [
+        # Employer lookups during import review use name__istartswith,
+        # which compiles to UPPER(name::text) LIKE UPPER(%s). Index the
+        # same expression with text_pattern_ops so prefix matches can use
+        # it regardless of the database collation.
+        migrations.RunSQL(
+            '''
+                CREATE INDEX IF NOT EXISTS payroll_employer_upper_name_like_idx
+                ON payroll_employer (UPPER(name::text) text_pattern_ops)
+            ''',
+            reverse_sql='''
+                DROP INDEX IF EXISTS payroll_employer_upper_name_like_idx
+            '''
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.9 on 2026-10-15 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0038_employer_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salary',
+            name='total_pay',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=11, null=True),
+        ),
+        # Salaries are inserted in bulk with raw SQL during import, so keep
+        # total pay up to date in the database, rather than in Python.
+        migrations.RunSQL('''
+            CREATE FUNCTION salary_total_pay_trigger() RETURNS trigger AS '
+                BEGIN
+                  NEW.total_pay := COALESCE(NEW.amount, 0) + COALESCE(NEW.extra_pay, 0);
+                  RETURN NEW;
+                END' LANGUAGE 'plpgsql'
+        ''', reverse_sql='DROP FUNCTION salary_total_pay_trigger CASCADE'),
+        migrations.RunSQL('''
+            CREATE TRIGGER salary_total_pay BEFORE INSERT OR UPDATE
+            ON payroll_salary FOR EACH ROW EXECUTE PROCEDURE
+            salary_total_pay_trigger()
+        ''', reverse_sql='DROP TRIGGER salary_total_pay ON payroll_salary'),
+        migrations.RunSQL('''
+            UPDATE payroll_salary
+            SET total_pay = COALESCE(amount, 0) + COALESCE(extra_pay, 0)
+        ''', reverse_sql='SELECT 1'),
+        migrations.AddIndex(
+            model_name='salary',
+            index=models.Index(fields=['total_pay'], name='payroll_salary_total_pay_idx'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 2.2.9 on 2026-10-15 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_import', '0009_upload_reporting_year'),
+        ('payroll', '0039_salary_total_pay'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='most_recent_year',
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        # Salaries are inserted in bulk during import, so use statement level
+        # triggers to update each affected job once per statement. Inserting
+        # salaries can only raise the most recent year of a job, so compare
+        # against the inserted salaries. Deleting salaries, e.g., when amending
+        # an import, or moving them between jobs or uploads can also lower it,
+        # so recompute it for each affected job. PL/pgSQL only plans the branch
+        # it runs, so each branch may refer to the transition tables of its own
+        # trigger.
+        migrations.RunSQL('''
+            CREATE FUNCTION job_most_recent_year_trigger() RETURNS trigger AS '
+                BEGIN
+                  IF TG_OP = ''INSERT'' THEN
+                    UPDATE payroll_job AS job
+                    SET most_recent_year = latest.reporting_year
+                    FROM (
+                      SELECT
+                        salary.job_id,
+                        MAX(upload.reporting_year) AS reporting_year
+                      FROM new_salaries AS salary
+                      JOIN data_import_upload AS upload
+                      ON salary.vintage_id = upload.id
+                      GROUP BY salary.job_id
+                    ) AS latest
+                    WHERE job.id = latest.job_id
+                      AND (job.most_recent_year IS NULL OR job.most_recent_year < latest.reporting_year);
+
+                  ELSIF TG_OP = ''DELETE'' THEN
+                    UPDATE payroll_job AS job
+                    SET most_recent_year = (
+                      SELECT MAX(upload.reporting_year)
+                      FROM payroll_salary AS salary
+                      JOIN data_import_upload AS upload
+                      ON salary.vintage_id = upload.id
+                      WHERE salary.job_id = job.id
+                    )
+                    WHERE job.id IN (SELECT job_id FROM old_salaries);
+
+                  ELSE
+                    UPDATE payroll_job AS job
+                    SET most_recent_year = (
+                      SELECT MAX(upload.reporting_year)
+                      FROM payroll_salary AS salary
+                      JOIN data_import_upload AS upload
+                      ON salary.vintage_id = upload.id
+                      WHERE salary.job_id = job.id
+                    )
+                    WHERE job.id IN (
+                      SELECT old_salary.job_id
+                      FROM old_salaries AS old_salary
+                      JOIN new_salaries AS new_salary
+                      ON old_salary.id = new_salary.id
+                      WHERE old_salary.job_id <> new_salary.job_id
+                        OR old_salary.vintage_id <> new_salary.vintage_id
+                      UNION
+                      SELECT new_salary.job_id
+                      FROM old_salaries AS old_salary
+                      JOIN new_salaries AS new_salary
+                      ON old_salary.id = new_salary.id
+                      WHERE old_salary.job_id <> new_salary.job_id
+                        OR old_salary.vintage_id <> new_salary.vintage_id
+                    );
+                  END IF;
+
+                  RETURN NULL;
+                END' LANGUAGE 'plpgsql'
+        ''', reverse_sql='DROP FUNCTION job_most_recent_year_trigger CASCADE'),
+        migrations.RunSQL('''
+            CREATE TRIGGER job_most_recent_year AFTER INSERT
+            ON payroll_salary REFERENCING NEW TABLE AS new_salaries
+            FOR EACH STATEMENT EXECUTE PROCEDURE
+            job_most_recent_year_trigger()
+        ''', reverse_sql='DROP TRIGGER job_most_recent_year ON payroll_salary'),
+        migrations.RunSQL('''
+            CREATE TRIGGER job_most_recent_year_delete AFTER DELETE
+            ON payroll_salary REFERENCING OLD TABLE AS old_salaries
+            FOR EACH STATEMENT EXECUTE PROCEDURE
+            job_most_recent_year_trigger()
+        ''', reverse_sql='DROP TRIGGER job_most_recent_year_delete ON payroll_salary'),
+        migrations.RunSQL('''
+            CREATE TRIGGER job_most_recent_year_update AFTER UPDATE
+            ON payroll_salary REFERENCING OLD TABLE AS old_salaries NEW TABLE AS new_salaries
+            FOR EACH STATEMENT EXECUTE PROCEDURE
+            job_most_recent_year_trigger()
+        ''', reverse_sql='DROP TRIGGER job_most_recent_year_update ON payroll_salary'),
+        migrations.RunSQL('''
+            UPDATE payroll_job AS job
+            SET most_recent_year = latest.reporting_year
+            FROM (
+              SELECT
+                salary.job_id,
+                MAX(upload.reporting_year) AS reporting_year
+              FROM payroll_salary AS salary
+              JOIN data_import_upload AS upload
+              ON salary.vintage_id = upload.id
+              GROUP BY salary.job_id
+            ) AS latest
+            WHERE job.id = latest.job_id
+        ''', reverse_sql='SELECT 1'),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['person', '-most_recent_year'], name='payroll_job_person_year_idx'),
+        ),
+    ]
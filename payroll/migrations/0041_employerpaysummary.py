@@ -0,0 +1,32 @@
+# Generated by Django 2.2.9 on 2026-10-15 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0040_job_most_recent_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployerPaySummary',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('reporting_year', models.IntegerField()),
+                ('headcount', models.IntegerField()),
+                ('base_pay', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('extra_pay', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('median_base_pay', models.FloatField(null=True)),
+                ('median_extra_pay', models.FloatField(null=True)),
+                ('median_total_pay', models.FloatField(null=True)),
+                ('employer', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='payroll.Employer')),
+            ],
+            options={
+                'db_table': 'payroll_employer_pay_summary',
+                'managed': False,
+            },
+        ),
+    ]
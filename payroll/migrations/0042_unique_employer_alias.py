@@ -0,0 +1,35 @@
+# Generated by Django 2.2.9 on 2026-10-15 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0041_employerpaysummary'),
+    ]
+
+    operations = [
+        # Keep the preferred, then the oldest, of any duplicate aliases, so
+        # the constraint can be added.
+        migrations.RunSQL('''
+            DELETE FROM payroll_employeralias
+            WHERE id IN (
+              SELECT id
+              FROM (
+                SELECT
+                  id,
+                  ROW_NUMBER() OVER (
+                    PARTITION BY name, employer_id
+                    ORDER BY preferred DESC, id
+                  ) AS rank
+                FROM payroll_employeralias
+              ) AS ranked
+              WHERE rank > 1
+            )
+        ''', reverse_sql='SELECT 1'),
+        migrations.AddConstraint(
+            model_name='employeralias',
+            constraint=models.UniqueConstraint(fields=('name', 'employer'), name='unique_employer_alias'),
+        ),
+    ]
@@ -1,9 +1,13 @@
+from decimal import Decimal
+
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.db import models, connection
-from django.db.models import Q, CheckConstraint, UniqueConstraint
+from django.db.models import Q, F, CheckConstraint, Count, UniqueConstraint
+from django.db.models.functions import Abs
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
-from django.db.models.functions import Coalesce
 from django_pgviews import view as pg
+from django_pgviews.signals import view_synced
 
 from bga_database.base_models import AliasModel, SluggedModel
 from data_import.models import Upload, RespondingAgency, SourceFile
@@ -14,9 +18,7 @@ class VintagedModel(models.Model):
 
     @property
     def reporting_year(self):
-        if not hasattr(self, '_reporting_year'):
-            self._reporting_year = self.vintage.standardized_file.get().reporting_year
-        return self._reporting_year
+        return self.vintage.reporting_year
 
     class Meta:
         abstract = True
@@ -48,6 +50,43 @@ class SourceFileMixin(object):
 
         return source_file
 
+    def _unit_responding_agency(self, unit_id, year):
+        '''
+        Return the responding agency for the given unit and year, caching it
+        on the instance, so repeated calls (e.g., via source_file) do not
+        each go to the database.
+        '''
+        if not hasattr(self, '_responding_agencies'):
+            self._responding_agencies = {}
+
+        key = (unit_id, year)
+
+        if key not in self._responding_agencies:
+            link = UnitRespondingAgency.objects\
+                                       .select_related('responding_agency')\
+                                       .get(unit_id=unit_id, reporting_year=year)
+
+            self._responding_agencies[key] = link.responding_agency
+
+        return self._responding_agencies[key]
+
+
+class EmployerManager(models.Manager):
+    def get_queryset(self):
+        # Always select the related parent, so additional queries are not
+        # needed for displaying the names of departments.
+        return super().get_queryset().select_related('parent')
+
+    def for_display(self):
+        '''
+        Select everything needed to render an employer page alongside the
+        employer, e.g., the parent and taxonomies for naming and comparisons,
+        and populations for the size class.
+        '''
+        return self.get_queryset()\
+                   .select_related('parent', 'parent__taxonomy', 'taxonomy', 'universe', 'vintage')\
+                   .prefetch_related('population')
+
 
 class Employer(SluggedModel, VintagedModel):
     name = models.CharField(max_length=255)
@@ -80,11 +119,19 @@ class Employer(SluggedModel, VintagedModel):
             )
         ]
 
+    objects = EmployerManager()
+
     def __str__(self):
         name = self.name
 
-        if self.parent and self.parent.name.lower() not in self.name.lower():
-            name = '{} {}'.format(self.parent, self.name)
+        # Check the foreign key column first, so units never touch the parent
+        # descriptor. The default manager selects the related parent, so
+        # departments don't need another query, either.
+        if self.parent_id:
+            parent = self.parent
+
+            if parent.name.lower() not in name.lower():
+                name = '{} {}'.format(parent, name)
 
         return name
 
@@ -97,26 +144,29 @@ class Employer(SluggedModel, VintagedModel):
             if self.universe:
                 raise ValidationError(_('Units may not have a universe. Did you mean to add a taxonomy?'))
 
-    @property
+    # The following properties only depend on foreign keys, which don't change
+    # over the life of an instance, so compute them once.
+
+    @cached_property
     def is_department(self):
-        return bool(self.parent)
+        return bool(self.parent_id)
 
-    @property
+    @cached_property
     def is_unclassified(self):
         '''
         Whether there is a group for comparison.
         '''
-        return (self.is_department and not self.universe) \
-            or (not self.is_department and not self.taxonomy)
+        return (self.is_department and not self.universe_id) \
+            or (not self.is_department and not self.taxonomy_id)
 
-    @property
+    @cached_property
     def endpoint(self):
         if self.is_department:
             return 'department'
         else:
             return 'unit'
 
-    @property
+    @cached_property
     def size_class(self):
         '''
         Small, medium, or large classification for the given employer, for the
@@ -129,100 +179,96 @@ class Employer(SluggedModel, VintagedModel):
 
         Note that Chicago is its own special class, and it should always be
         large.
+
+        The classification is stored alongside each population, and updated
+        whenever populations or taxonomies change. See
+        EmployerPopulation.update_size_class.
         '''
-        # Create a size class lookup where the key is a unique tuple,
-        # (entity type, is_special), and the value is a tuple, (lower size
-        # class boundary, upper size class boundary), where the boundaries
-        # are population in thousands, such that an entity with a population
-        # greater than or equal to the upper boundary is Large; less than the
-        # upper but greater than or equal to the lower boundary is Medium; or
-        # less than the lower boundary is Small.
-        class_lookup = {
-            ('Municipal', True): (-1, -1),  # Chicago municipal (always large)
-            ('Municipal', False): (10, 50),  # Non-Chicago municipal
-            ('County', True): (500, 1000),  # Cook or collar county
-            ('County', False): (25, 75),  # Downstate county
-            ('Township', True): (25, 100),  # Cook or collar township
-            ('Township', False): (10, 50),  # Downstate township
-        }
+        population = self._closest_population()
 
-        if self.taxonomy:
-            lookup_key = (self.taxonomy.entity_type, self.taxonomy.is_special)
+        if population:
+            return population.size_class
 
-            bounds = class_lookup.get(lookup_key)
+    @property
+    def populations(self):
+        '''
+        Evaluate populations once per instance. This is free if the caller
+        prefetched population.
+        '''
+        if not hasattr(self, '_populations'):
+            self._populations = list(self.population.all())
+        return self._populations
 
-            if bounds:
-                lower_bound, upper_bound = bounds
-                population = self.get_population()
+    def _closest_population(self, year=None):
+        '''
+        If we have no population information, return None. Otherwise, return
+        the population object closest to the target year (reporting year by
+        default, but configurable to support viewing data from previous years
+        in the future). Prefer the more recent population in case of a tie.
 
-                if population:
-                    if population >= upper_bound * 1000:
-                        return 'Large'
+        If populations were prefetched or already evaluated, pick from them.
+        Otherwise, select only the closest population, and remember it for
+        the target year.
+        '''
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
 
-                    elif population >= lower_bound * 1000:
-                        return 'Medium'
+        if hasattr(self, '_populations') or 'population' in prefetched:
+            if not self.populations:
+                return None
 
-                    else:
-                        return 'Small'
+            target_year = year or self.reporting_year
 
-        else:
-            return None
+            return min(self.populations,
+                       key=lambda p: (abs(target_year - p.data_year), -p.data_year))
+
+        target_year = year or self.reporting_year
+
+        if not hasattr(self, '_closest_populations'):
+            self._closest_populations = {}
+
+        if target_year not in self._closest_populations:
+            self._closest_populations[target_year] = self.population\
+                .annotate(distance=Abs(F('data_year') - target_year))\
+                .order_by('distance', '-data_year')\
+                .first()
+
+        return self._closest_populations[target_year]
 
     def get_population(self, year=None):
         '''
-        If we have no population information, return None. Otherwise, return
-        the population closest to the target year (reporting year by default,
-        but configurable to support viewing data from previous years in the
-        future).
+        Return the population closest to the target year, or None if we have
+        no population information.
         '''
-        if self.population.all():
-            if year:
-                target_year = year
-            else:
-                source_file = self.vintage.standardized_file.get()
-                target_year = source_file.reporting_year
+        population = self._closest_population(year=year)
 
-            population_years = [p.data_year for p in self.population.all()]
-            closest = min(population_years, key=lambda x: target_year - x)
+        if population:
+            return population.population
 
-            return self.population.get(data_year=closest).population
+    @property
+    def employer_ids(self):
+        '''
+        IDs of the employer and its departments. Evaluate these once, so
+        salary queries filter on a short list of IDs, rather than nesting a
+        subquery.
+        '''
+        if not hasattr(self, '_employer_ids'):
+            self._employer_ids = list(
+                Employer.objects.filter(Q(id=self.id) | Q(parent_id=self.id))
+                                .values_list('id', flat=True)
+            )
+        return self._employer_ids
 
     def get_salaries(self, year=None):
-        employer_and_children = Employer.objects.filter(Q(id=self.id) | Q(parent_id=self.id))
-
-        of_employer = Q(job__position__employer__in=employer_and_children)
+        of_employer = Q(job__position__employer_id__in=self.employer_ids)
 
         if year:
-            in_year = Q(vintage__standardized_file__reporting_year=year)
+            in_year = Q(vintage__reporting_year=year)
             criteria = of_employer & in_year
         else:
             criteria = of_employer
 
         return Salary.objects.filter(criteria)
 
-    @property
-    def employee_salaries(self):
-        query = '''
-            SELECT
-              COALESCE(salary.amount, 0) + COALESCE(salary.extra_pay, 0) AS amount
-            FROM payroll_job AS job
-            JOIN payroll_salary AS salary
-            ON salary.job_id = job.id
-            JOIN payroll_position AS position
-            ON job.position_id = position.id
-            JOIN payroll_employer as employer
-            ON position.employer_id = employer.id
-            WHERE employer.id = {id}
-            OR employer.parent_id = {id}
-        '''.format(id=self.id)
-
-        with connection.cursor() as cursor:
-            cursor.execute(query)
-
-            employee_salaries = [row[0] for row in cursor]
-
-        return employee_salaries
-
 
 class EmployerAlias(AliasModel):
     entity_type = 'employer'
@@ -232,51 +278,168 @@ class EmployerAlias(AliasModel):
         on_delete=models.CASCADE
     )
 
-    def clean(self):
-        super().clean()
-
-        existing_alias = type(self).objects.filter(
-            name=self.name,
-            employer=self.employer
-        ).exclude(
-            id=self.id
-        )
-
-        if existing_alias.exists():
-            msg = 'Alias "{0}" already exists for employer "{1}".'.format(self.name,
-                                                                          self.employer)
-            raise ValidationError(msg)
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['name', 'employer'], name='unique_employer_alias')
+        ]
 
 
 class EmployerHighestSalaries(pg.MaterializedView):
     '''
     Materialized view of employer total pay, for retrieving highest salaries
     in a given year.
+
+    Employers are at most one level deep, so unit_id, the employer itself for
+    units and the parent for departments, is the whole ancestry of the
+    employer. Store it, so salaries can be grouped and looked up by unit
+    without computing it for every row.
     '''
     sql = '''
         SELECT
           salary."id" as payroll_salary_id,
           employer.id as employer_id,
           employer.parent_id as employer_parent_id,
-          s_file.reporting_year as reporting_year,
-          Coalesce(salary."amount", 0) + Coalesce(salary."extra_pay", 0) as total_pay
+          COALESCE(employer.parent_id, employer.id) as unit_id,
+          upload.reporting_year as reporting_year,
+          salary."total_pay" as total_pay
         FROM "payroll_salary" salary
         INNER JOIN "payroll_job" job ON (salary."job_id" = job."id")
         INNER JOIN "payroll_position" position ON (job."position_id" = position."id")
         INNER JOIN "data_import_upload" upload ON (salary."vintage_id" = upload."id")
-        INNER JOIN "data_import_standardizedfile" s_file ON (upload."id" = s_file."upload_id")
         INNER JOIN "payroll_employer" employer ON (position."employer_id" = employer."id")
     '''
 
+    # sync_pgviews creates a unique index on this column alongside the view,
+    # so the view can be refreshed concurrently, i.e., without locking out
+    # readers.
+    concurrent_index = 'payroll_salary_id'
+
+    # Additional indexes, created whenever sync_pgviews (re)creates the view.
+    # See create_view_indexes.
+    view_indexes = (
+        '''
+            CREATE INDEX IF NOT EXISTS payroll_highest_salaries_year_pay_idx
+            ON payroll_employer_highest_salaries (reporting_year, total_pay DESC)
+        ''',
+        '''
+            CREATE INDEX IF NOT EXISTS payroll_highest_salaries_unit_year_idx
+            ON payroll_employer_highest_salaries (unit_id, reporting_year)
+        ''',
+    )
+
     class Meta:
         app_label = 'payroll'
         db_table = 'payroll_employer_highest_salaries'
         managed = False
 
 
-class UnitManager(models.Manager):
+class EmployerPaySummary(pg.MaterializedView):
+    '''
+    Materialized view of payroll totals and medians for each employer and
+    reporting year, so employer pages need not aggregate every salary on each
+    request. Summaries of units include the salaries of their departments.
+    '''
+    sql = '''
+        WITH salaries AS (
+          SELECT
+            employer.id AS employer_id,
+            employer.parent_id AS employer_parent_id,
+            upload.reporting_year,
+            salary.amount,
+            salary.extra_pay,
+            salary.total_pay
+          FROM payroll_salary AS salary
+          JOIN payroll_job AS job
+          ON salary.job_id = job.id
+          JOIN payroll_position AS position
+          ON job.position_id = position.id
+          JOIN payroll_employer AS employer
+          ON position.employer_id = employer.id
+          JOIN data_import_upload AS upload
+          ON salary.vintage_id = upload.id
+        )
+        SELECT
+          CONCAT(rollup.employer_id, '.', salaries.reporting_year) AS id,
+          rollup.employer_id,
+          salaries.reporting_year,
+          COUNT(*) AS headcount,
+          SUM(COALESCE(salaries.amount, 0)) AS base_pay,
+          SUM(COALESCE(salaries.extra_pay, 0)) AS extra_pay,
+          percentile_cont(0.5) WITHIN GROUP (
+            ORDER BY salaries.amount
+          ) AS median_base_pay,
+          percentile_cont(0.5) WITHIN GROUP (
+            ORDER BY salaries.extra_pay
+          ) AS median_extra_pay,
+          percentile_cont(0.5) WITHIN GROUP (
+            ORDER BY NULLIF(salaries.total_pay, 0)
+          ) AS median_total_pay
+        FROM salaries
+        /* Count each salary toward its employer and, for departments, the
+        parent unit. */
+        CROSS JOIN LATERAL (
+          VALUES (salaries.employer_id), (salaries.employer_parent_id)
+        ) AS rollup (employer_id)
+        WHERE rollup.employer_id IS NOT NULL
+        GROUP BY rollup.employer_id, salaries.reporting_year
+    '''
+
+    # One row per employer and year, identified like the Solr documents, e.g.,
+    # "42.2019", which is also the unique index concurrent refreshes need.
+    concurrent_index = 'id'
+
+    id = models.CharField(max_length=255, primary_key=True)
+    employer = models.ForeignKey(
+        'Employer',
+        related_name='+',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    reporting_year = models.IntegerField()
+    headcount = models.IntegerField()
+    base_pay = models.DecimalField(max_digits=15, decimal_places=2)
+    extra_pay = models.DecimalField(max_digits=15, decimal_places=2)
+    median_base_pay = models.FloatField(null=True)
+    median_extra_pay = models.FloatField(null=True)
+    median_total_pay = models.FloatField(null=True)
+
+    class Meta:
+        app_label = 'payroll'
+        db_table = 'payroll_employer_pay_summary'
+        managed = False
+
+    @classmethod
+    def summary_id(cls, employer_id, year):
+        return '{0}.{1}'.format(employer_id, year)
+
+    @classmethod
+    def for_employer(cls, employer_id, year):
+        '''
+        Return the summary of the given employer and year, as a dictionary.
+        Employers without salaries in that year have no row in the view, so
+        fall back to an empty summary.
+        '''
+        fields = (
+            'headcount',
+            'base_pay',
+            'extra_pay',
+            'median_base_pay',
+            'median_extra_pay',
+            'median_total_pay',
+        )
+
+        summary = cls.objects.filter(id=cls.summary_id(employer_id, year))\
+                             .values(*fields)\
+                             .first()
+
+        return summary or {field: 0 for field in fields}
+
+
+class UnitManager(EmployerManager):
     def get_queryset(self):
-        return super().get_queryset().filter(parent_id__isnull=True)
+        # Units don't have a parent, so skip the join.
+        return super().get_queryset().filter(parent_id__isnull=True)\
+                                     .select_related(None)
 
 
 class Unit(Employer, SourceFileMixin):
@@ -289,9 +452,7 @@ class Unit(Employer, SourceFileMixin):
         return self.name
 
     def responding_agency(self, year):
-        return self.responding_agencies\
-                   .get(reporting_year=year)\
-                   .responding_agency
+        return self._unit_responding_agency(self.id, year)
 
     @property
     def is_comparable(self):
@@ -299,17 +460,14 @@ class Unit(Employer, SourceFileMixin):
         Whether there is more than one to compare within the group.
         '''
         if not self.is_unclassified:
-            return self.taxonomy.employers.count() > 1
+            return self.taxonomy.employers.exclude(pk=self.pk).exists()
         else:
             return False
 
 
-class DepartmentManager(models.Manager):
+class DepartmentManager(EmployerManager):
     def get_queryset(self):
-        # Always select the related parent, so additional queries are not
-        # needed for displaying the name.
-        return super().get_queryset().filter(parent_id__isnull=False)\
-                                     .select_related('parent')
+        return super().get_queryset().filter(parent_id__isnull=False)
 
 
 class Department(Employer, SourceFileMixin):
@@ -318,18 +476,8 @@ class Department(Employer, SourceFileMixin):
 
     objects = DepartmentManager()
 
-    def __str__(self):
-        if self.parent.name.lower() not in self.name.lower():
-            return '{} {}'.format(self.parent, self.name)
-
-        else:
-            return self.name
-
     def responding_agency(self, year):
-        return self.parent\
-                   .responding_agencies\
-                   .get(reporting_year=year)\
-                   .responding_agency
+        return self._unit_responding_agency(self.parent_id, year)
 
     @property
     def is_comparable(self):
@@ -340,7 +488,8 @@ class Department(Employer, SourceFileMixin):
             return self.universe\
                        .employers\
                        .filter(parent__taxonomy=self.parent.taxonomy)\
-                       .count() > 1
+                       .exclude(pk=self.pk)\
+                       .exists()
 
         else:
             return False
@@ -399,16 +548,121 @@ class EmployerTaxonomy(models.Model):
         verbose_name_plural = 'Employer taxonomies'
 
 
+# Size class lookup where the key is a unique tuple, (entity type,
+# is_special), and the value is a tuple, (lower size class boundary, upper
+# size class boundary), where the boundaries are population in thousands, such
+# that an entity with a population greater than or equal to the upper boundary
+# is Large; less than the upper but greater than or equal to the lower boundary
+# is Medium; or less than the lower boundary is Small.
+_SIZE_CLASS_BOUNDS = {
+    ('Municipal', True): (-1, -1),  # Chicago municipal (always large)
+    ('Municipal', False): (10, 50),  # Non-Chicago municipal
+    ('County', True): (500, 1000),  # Cook or collar county
+    ('County', False): (25, 75),  # Downstate county
+    ('Township', True): (25, 100),  # Cook or collar township
+    ('Township', False): (10, 50),  # Downstate township
+}
+
+
 class EmployerPopulation(models.Model):
     employer = models.ForeignKey('Employer',
                                  related_name='population',
                                  on_delete=models.CASCADE)
     population = models.IntegerField()
     data_year = models.IntegerField()
+    size_class = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['employer', 'data_year'],
+                name='payroll_pop_employer_year_idx'
+            )
+        ]
 
     def __str__(self):
         return '{0} ({1})'.format(self.population, self.data_year)
 
+    @classmethod
+    def closest_for(cls, employer_ids, year=None):
+        '''
+        Return a dictionary mapping the given employer IDs to the population
+        closest to the target year, in one query. Like
+        Employer._closest_population, the target year defaults to each
+        employer's reporting year, and ties go to the more recent population.
+        Employers without population information are omitted.
+        '''
+        query = '''
+            SELECT DISTINCT ON (pop.employer_id)
+              pop.*
+            FROM payroll_employerpopulation AS pop
+            JOIN payroll_employer AS emp
+            ON pop.employer_id = emp.id
+            JOIN data_import_upload AS upload
+            ON emp.vintage_id = upload.id
+            WHERE pop.employer_id = ANY(%s)
+            ORDER BY
+              pop.employer_id,
+              ABS(pop.data_year - COALESCE(%s::INTEGER, upload.reporting_year)),
+              pop.data_year DESC
+        '''
+
+        populations = cls.objects.raw(query, [list(employer_ids), year])
+
+        return {population.employer_id: population for population in populations}
+
+    @classmethod
+    def update_size_class(cls, employer_ids=None):
+        '''
+        Classify populations as Small, Medium, or Large in a single pass,
+        according to the taxonomy of the employer they belong to. Populations
+        of employers without a classifiable taxonomy are set to null.
+
+        Optionally, limit the update to the given list of employer IDs.
+        '''
+        bounds = []
+        params = []
+
+        for (entity_type, is_special), (lower_bound, upper_bound) in _SIZE_CLASS_BOUNDS.items():
+            bounds.append('(%s, %s, %s, %s)')
+            params.extend([entity_type, is_special, lower_bound, upper_bound])
+
+        update = '''
+            UPDATE payroll_employerpopulation AS pop
+            SET size_class = classified.size_class
+            FROM (
+              SELECT
+                pop.id,
+                CASE
+                  WHEN bounds.entity_type IS NULL OR pop.population = 0 THEN NULL
+                  WHEN pop.population >= bounds.upper_bound * 1000 THEN 'Large'
+                  WHEN pop.population >= bounds.lower_bound * 1000 THEN 'Medium'
+                  ELSE 'Small'
+                END AS size_class
+              FROM payroll_employerpopulation AS pop
+              JOIN payroll_employer AS employer
+                ON pop.employer_id = employer.id
+              LEFT JOIN payroll_employertaxonomy AS taxonomy
+                ON employer.taxonomy_id = taxonomy.id
+              LEFT JOIN (VALUES {bounds}) AS bounds (entity_type, is_special, lower_bound, upper_bound)
+                ON taxonomy.entity_type = bounds.entity_type
+                AND (taxonomy.chicago OR taxonomy.cook_or_collar) = bounds.is_special
+            ) AS classified
+            WHERE pop.id = classified.id
+        '''.format(bounds=', '.join(bounds))
+
+        if employer_ids is not None:
+            employer_ids = list(employer_ids)
+
+            if not employer_ids:
+                return
+
+            update += ' AND pop.employer_id = ANY(%s)'
+            params.append(employer_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(update, params)
+
 
 class EmployerUniverse(models.Model):
     '''
@@ -451,24 +705,21 @@ class Person(SluggedModel, VintagedModel, SourceFileMixin):
         '''
         return self.jobs\
                    .select_related('position', 'position__employer', 'position__employer__parent')\
-                   .order_by('-salaries__vintage__standardized_file__reporting_year')\
+                   .order_by(F('most_recent_year').desc(nulls_last=True))\
                    .first()
 
     def responding_agency(self, year):
         employer = self.jobs\
-                       .get(vintage__standardized_file__reporting_year=year)\
+                       .select_related('position__employer')\
+                       .get(vintage__reporting_year=year)\
                        .position\
                        .employer
 
-        if employer.is_department:
-            unit = employer.parent
+        # Departments report through their parent unit. Use the parent ID
+        # directly, rather than loading the parent itself.
+        unit_id = employer.parent_id or employer.id
 
-        else:
-            unit = employer
-
-        return unit.responding_agencies\
-                   .get(reporting_year=year)\
-                   .responding_agency
+        return self._unit_responding_agency(unit_id, year)
 
 
 class Job(VintagedModel):
@@ -478,6 +729,17 @@ class Job(VintagedModel):
     position = models.ForeignKey('Position', on_delete=models.CASCADE, related_name='jobs')
     start_date = models.DateField(null=True)
 
+    # Latest reporting year with a salary for this job, maintained by the
+    # job_most_recent_year triggers on inserts, updates, and deletes of
+    # payroll_salary, so the most recent job of a person can be found without
+    # joining and sorting their salaries.
+    most_recent_year = models.IntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['person', '-most_recent_year'], name='payroll_job_person_year_idx')
+        ]
+
     def __str__(self):
         return '{0} – {1}'.format(self.person, self.position)
 
@@ -501,17 +763,29 @@ class Position(VintagedModel):
 
 class SalaryManager(models.Manager):
 
-    def get_queryset(self):
-        return super().get_queryset().annotate(
-            total_pay=Coalesce('amount', 0) + Coalesce('extra_pay', 0)
-        )
-
     def with_related_objects(self):
+        '''
+        Select the related objects needed to display a list of salaries, and
+        only the fields the salary listings use. Accessing any other field
+        will issue an extra query per salary, so add it here if you need it.
+        '''
         return self.select_related(
             'job',
             'job__person',
             'job__position',
-            'job__position__employer',
+            'job__position__employer'
+        ).only(
+            'amount',
+            'extra_pay',
+            'total_pay',
+            'job__start_date',
+            'job__person__first_name',
+            'job__person__last_name',
+            'job__person__slug',
+            'job__position__title',
+            'job__position__employer__name',
+            'job__position__employer__slug',
+            # Needed for the employer endpoint, which does not load the parent.
             'job__position__employer__parent'
         )
 
@@ -536,6 +810,10 @@ class Salary(VintagedModel):
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     extra_pay = models.DecimalField(max_digits=10, decimal_places=2, null=True)
 
+    # Sum of amount and extra pay, maintained by the salary_total_pay trigger,
+    # so it can be indexed and sorted on without being recomputed.
+    total_pay = models.DecimalField(max_digits=11, decimal_places=2, null=True, editable=False)
+
     class Meta:
         constraints = [
             CheckConstraint(
@@ -543,45 +821,24 @@ class Salary(VintagedModel):
                 name='total_pay_not_null'
             )
         ]
+        indexes = [
+            models.Index(fields=['total_pay'], name='payroll_salary_total_pay_idx')
+        ]
 
     def __str__(self):
         return '{0} {1}'.format(self.amount, self.job)
 
+    def save(self, *args, **kwargs):
+        # The database sets total pay on save, too. Set it here so the saved
+        # instance reflects it without being refreshed.
+        self.total_pay = Decimal(self.amount or 0) + Decimal(self.extra_pay or 0)
+        super().save(*args, **kwargs)
+
     @property
     def employer_percentile(self):
-        query = '''
-            WITH salary_percentiles AS (
-              SELECT
-                percent_rank() OVER (
-                  ORDER BY COALESCE(amount, 0) + COALESCE(extra_pay, 0) ASC
-                ) AS percentile,
-                job.person_id
-              FROM payroll_job AS job
-              JOIN payroll_salary AS salary
-                ON salary.job_id = job.id
-              JOIN payroll_position AS position
-                ON job.position_id = position.id
-              JOIN payroll_employer as employer
-                ON position.employer_id = employer.id
-              JOIN data_import_upload AS upload
-                ON salary.vintage_id = upload.id
-              JOIN data_import_standardizedfile AS s_file
-                ON upload.id = s_file.upload_id
-              WHERE (employer.id = {employer_id} OR employer.parent_id = {employer_id})
-                AND s_file.reporting_year = {reporting_year}
-            )
-            SELECT percentile
-            FROM salary_percentiles
-            WHERE person_id = {id}
-        '''.format(employer_id=self.job.position.employer.id,
-                   id=self.job.person.id,
-                   reporting_year=self.reporting_year)
-
-        with connection.cursor() as cursor:
-            cursor.execute(query)
-            result = cursor.fetchone()
+        employer = self.job.position.employer
 
-        return result[0] * 100
+        return self._percentile(Q(job__position__employer_id__in=employer.employer_ids))
 
     @property
     def like_employer_percentile(self):
@@ -597,92 +854,74 @@ class Salary(VintagedModel):
             return self._like_unit_percentile(employer)
 
     def _like_unit_percentile(self, employer):
-        query = '''
-            WITH employer_parent_lookup AS (
-              SELECT
-                id,
-                COALESCE(parent_id, id) AS parent_id
-              FROM payroll_employer
-            ), salary_percentiles AS (
-              SELECT
-                percent_rank() OVER (
-                  ORDER BY COALESCE(amount, 0) + COALESCE(extra_pay, 0) ASC
-                ) AS percentile,
-                job.person_id
-              FROM payroll_job AS job
-              JOIN payroll_salary AS salary
-                ON salary.job_id = job.id
-              JOIN payroll_position AS position
-                ON job.position_id = position.id
-              JOIN employer_parent_lookup AS lookup
-                ON position.employer_id = lookup.id
-              JOIN payroll_employer AS employer
-                ON lookup.parent_id = employer.id
-              JOIN data_import_upload AS upload
-                ON salary.vintage_id = upload.id
-              JOIN data_import_standardizedfile AS s_file
-                ON upload.id = s_file.upload_id
-              WHERE employer.taxonomy_id = {taxonomy}
-                AND s_file.reporting_year = {reporting_year}
-            )
-            SELECT percentile
-            FROM salary_percentiles
-            WHERE person_id = {id}
-        '''.format(taxonomy=employer.taxonomy.id,
-                   id=self.job.person.id,
-                   reporting_year=self.reporting_year)
+        # Compare to salaries of all units in the same taxonomy, including
+        # their departments.
+        of_unit = Q(job__position__employer__parent_id__isnull=True,
+                    job__position__employer__taxonomy_id=employer.taxonomy_id)
+        of_department = Q(job__position__employer__parent__taxonomy_id=employer.taxonomy_id)
 
-        with connection.cursor() as cursor:
-            cursor.execute(query)
-            result = cursor.fetchone()
-
-        return result[0] * 100
+        return self._percentile(of_unit | of_department)
 
     def _like_department_percentile(self, employer):
         if employer.parent.is_unclassified:
             return None
 
         else:
-            query = '''
-                WITH taxonomy_members AS (
-                  SELECT
-                    department.id,
-                    department.universe_id
-                  FROM payroll_employer AS unit
-                  JOIN payroll_employer AS department
-                  ON unit.id = department.parent_id
-                  WHERE unit.taxonomy_id = {taxonomy}
-                ),
-                salary_percentiles AS (
-                  SELECT
-                    percent_rank() OVER (
-                      ORDER BY COALESCE(amount, 0) + COALESCE(extra_pay, 0) ASC
-                    ) AS percentile,
-                    job.person_id
-                  FROM payroll_job AS job
-                  JOIN payroll_salary AS salary
-                    ON salary.job_id = job.id
-                  JOIN payroll_position AS position
-                    ON job.position_id = position.id
-                  JOIN taxonomy_members AS department
-                    ON position.employer_id = department.id
-                  JOIN data_import_upload AS upload
-                    ON salary.vintage_id = upload.id
-                  JOIN data_import_standardizedfile AS s_file
-                    ON upload.id = s_file.upload_id
-                  WHERE department.universe_id = {universe}
-                    AND s_file.reporting_year = {reporting_year}
-                )
-                SELECT percentile
-                FROM salary_percentiles
-                WHERE person_id = {id}
-            '''.format(taxonomy=employer.parent.taxonomy.id,
-                       universe=employer.universe.id,
-                       id=self.job.person.id,
-                       reporting_year=self.reporting_year)
-
-            with connection.cursor() as cursor:
-                cursor.execute(query)
-                result = cursor.fetchone()
-
-            return result[0] * 100
+            # Compare to salaries of departments in the same universe, whose
+            # units share a taxonomy.
+            return self._percentile(Q(
+                job__position__employer__parent__taxonomy_id=employer.parent.taxonomy_id,
+                job__position__employer__universe_id=employer.universe_id
+            ))
+
+    def _percentile(self, peers):
+        '''
+        Return the percent rank of this salary among salaries from the same
+        reporting year matching the peers filter, i.e., the percent of the
+        other salaries with lower total pay. This matches percent_rank() OVER
+        (ORDER BY total_pay), but it only needs to count salaries in a single
+        pass, rather than sort all of them.
+
+        Each kind of percentile differs only in its peers filter, so they all
+        share this one query.
+        '''
+        salaries = Salary.objects.filter(peers, vintage__reporting_year=self.reporting_year)
+
+        counts = salaries.aggregate(
+            lower=Count('id', filter=Q(total_pay__lt=self.total_pay)),
+            total=Count('id')
+        )
+
+        if counts['total'] <= 1:
+            return 0
+
+        return counts['lower'] / (counts['total'] - 1) * 100
+
+
+def refresh_salary_views():
+    '''
+    Refresh the materialized views derived from salaries, then bump the data
+    version, so pages and API ETags reflect the change. Call this whenever
+    salaries are added or removed, e.g., after an import or once a deletion
+    has been committed.
+    '''
+    from payroll.cache import bump_data_version
+
+    EmployerHighestSalaries.refresh(concurrently=True)
+    EmployerPaySummary.refresh(concurrently=True)
+
+    bump_data_version()
+
+
+def create_view_indexes(sender, has_changed, **kwargs):
+    '''
+    sync_pgviews drops and recreates materialized views, taking any indexes
+    with them, so recreate the indexes a view defines after it is synced.
+    '''
+    if has_changed and hasattr(sender, 'view_indexes'):
+        with connection.cursor() as cursor:
+            for index in sender.view_indexes:
+                cursor.execute(index)
+
+
+view_synced.connect(create_view_indexes)
@@ -1,11 +1,11 @@
 from django.conf import settings
-from django.db import connection
-from django.db.models import Q, FloatField, Sum, Max
-from django.db.models.functions import Coalesce, NullIf
-from postgres_stats.aggregates import Percentile
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 from rest_framework import serializers
 
-from payroll.models import Employer, Unit, Department, Salary, Person
+from bga_database.routers import read_connection
+from payroll.cache import get_taxonomy, get_universe
+from payroll.models import Employer, EmployerPaySummary, Unit, Department, Salary, Person
 from payroll.charts import ChartHelperMixin
 from payroll.utils import format_exact_number, format_ballpark_number, \
     format_salary, format_percentile
@@ -19,30 +19,39 @@ class IndexSerializer(serializers.Serializer, ChartHelperMixin):
     salary_json = serializers.SerializerMethodField()
 
     def get_salary_count(self, data_year):
-        count = Salary.objects.filter(vintage__standardized_file__reporting_year=data_year).count()
-        return format_exact_number(count)
+        return format_exact_number(len(self.all_salaries))
 
     def get_unit_count(self, data_year):
         count = Unit.objects.filter(responding_agencies__reporting_year=data_year).count()
         return format_exact_number(count)
 
-    def get_salary_json(self, data_year):
-        with connection.cursor() as cursor:
-            cursor.execute('''
-                SELECT
-                  COALESCE(amount, 0) + COALESCE(extra_pay, 0)
-                FROM payroll_salary AS salary
-                JOIN data_import_upload AS upload
-                ON salary.vintage_id = upload.id
-                JOIN data_import_standardizedfile AS file
-                ON upload.id = file.upload_id
-                WHERE file.reporting_year = {}
-            '''.format(data_year))
+    @property
+    def all_salaries(self):
+        '''
+        Total pay for every salary in the data year. The salary count is
+        the length of this list, so fetch it once and share it between
+        salary_count and salary_json. Totals are only used for binning, so
+        cast them to floats in the database, rather than building a Decimal
+        for every row.
+        '''
+        if not hasattr(self, '_all_salaries'):
+            with read_connection().cursor() as cursor:
+                cursor.execute('''
+                    SELECT
+                      total_pay::DOUBLE PRECISION
+                    FROM payroll_salary AS salary
+                    JOIN data_import_upload AS upload
+                    ON salary.vintage_id = upload.id
+                    WHERE upload.reporting_year = %s
+                ''', [self.instance])
 
-            all_salaries = [x[0] for x in cursor]
+                self._all_salaries = [x[0] for x in cursor]
 
+        return self._all_salaries
+
+    def get_salary_json(self, data_year):
         try:
-            return self.bin_salary_data(all_salaries)
+            return self.bin_salary_data(self.all_salaries)
 
         except ValueError:
             if settings.DEBUG:
@@ -64,16 +73,6 @@ class EmployerSerializer(serializers.ModelSerializer, ChartHelperMixin):
     source_link = serializers.SerializerMethodField()
     payroll_expenditure = serializers.SerializerMethodField()
 
-    @property
-    def salary_q(self):
-        return Q(positions__jobs__salaries__vintage__standardized_file__reporting_year=self.context['data_year'])
-
-    @property
-    def employer_queryset(self):
-        return Employer.objects.filter(
-            Q(id=self.instance.id) | Q(parent_id=self.instance.id)
-        )
-
     @property
     def employer_salaries(self):
         if not hasattr(self, '_employer_salaries'):
@@ -81,75 +80,30 @@ class EmployerSerializer(serializers.ModelSerializer, ChartHelperMixin):
         return self._employer_salaries
 
     @property
-    def employer_salary_count(self):
-        if not hasattr(self, '_employer_salary_count'):
-            self._employer_salary_count = self.employer_salaries.count()
-        return self._employer_salary_count
-
-    @property
-    def employer_median_salaries(self):
-        if not hasattr(self, '_employer_median_salaries'):
-            median_base_pay = Percentile(
-                'positions__jobs__salaries__amount',
-                0.5,
-                filter=self.salary_q,
-                output_field=FloatField()
-            )
-            median_extra_pay = Percentile(
-                'positions__jobs__salaries__extra_pay',
-                0.5,
-                filter=self.salary_q,
-                output_field=FloatField()
-            )
-            median_total_pay = Percentile(
-                NullIf(
-                    Coalesce('positions__jobs__salaries__amount', 0) +
-                    Coalesce('positions__jobs__salaries__extra_pay', 0), 0
-                ),
-                0.5,
-                filter=self.salary_q,
-                output_field=FloatField()
-            )
-
-            self._employer_median_salaries = self.employer_queryset.aggregate(
-                median_base_pay=Coalesce(median_base_pay, 0),
-                median_extra_pay=Coalesce(median_extra_pay, 0),
-                median_total_pay=Coalesce(median_total_pay, 0)
+    def employer_pay_summary(self):
+        if not hasattr(self, '_employer_pay_summary'):
+            self._employer_pay_summary = EmployerPaySummary.for_employer(
+                self.instance.id,
+                self.context['data_year']
             )
-
-        return self._employer_median_salaries
+        return self._employer_pay_summary
 
     @property
-    def employer_payroll(self):
-        if not hasattr(self, '_employer_payroll'):
-            entity_base_pay = Sum(
-                Coalesce('positions__jobs__salaries__amount', 0),
-                filter=self.salary_q
-            )
-            entity_extra_pay = Sum(
-                Coalesce('positions__jobs__salaries__extra_pay', 0),
-                filter=self.salary_q
-            )
-
-            self._employer_payroll = self.employer_queryset.aggregate(
-                base_pay=Coalesce(entity_base_pay, 0),
-                extra_pay=Coalesce(entity_extra_pay, 0)
-            )
-
-        return self._employer_payroll
+    def employer_salary_count(self):
+        return self.employer_pay_summary['headcount']
 
     def get_salaries(self, obj):
         data = []
 
-        with connection.cursor() as cursor:
+        with read_connection().cursor() as cursor:
             cursor.execute('''
                 SELECT payroll_salary_id
                 FROM payroll_employer_highest_salaries
-                WHERE (employer_id = {employer_id} OR employer_parent_id = {employer_id})
-                  AND reporting_year = {reporting_year}
+                WHERE (employer_id = %(employer_id)s OR unit_id = %(employer_id)s)
+                  AND reporting_year = %(reporting_year)s
                 ORDER BY total_pay DESC
                 LIMIT 5
-            '''.format(employer_id=obj.id, reporting_year=self.context['data_year']))
+            ''', {'employer_id': obj.id, 'reporting_year': self.context['data_year']})
 
             top_salaries = [x[0] for x in cursor]
 
@@ -186,20 +140,20 @@ class EmployerSerializer(serializers.ModelSerializer, ChartHelperMixin):
         return data
 
     def get_median_tp(self, obj):
-        if self.employer_median_salaries['median_total_pay']:
-            return format_salary(self.employer_median_salaries['median_total_pay'])
+        if self.employer_pay_summary['median_total_pay']:
+            return format_salary(self.employer_pay_summary['median_total_pay'])
         else:
             return 'Not reported'
 
     def get_median_bp(self, obj):
-        if self.employer_median_salaries['median_base_pay']:
-            return format_salary(self.employer_median_salaries['median_base_pay'])
+        if self.employer_pay_summary['median_base_pay']:
+            return format_salary(self.employer_pay_summary['median_base_pay'])
         else:
             return 'Not reported'
 
     def get_median_ep(self, obj):
-        if self.employer_median_salaries['median_extra_pay']:
-            return format_salary(self.employer_median_salaries['median_extra_pay'])
+        if self.employer_pay_summary['median_extra_pay']:
+            return format_salary(self.employer_pay_summary['median_extra_pay'])
         else:
             return 'Not reported'
 
@@ -207,12 +161,14 @@ class EmployerSerializer(serializers.ModelSerializer, ChartHelperMixin):
         return format_ballpark_number(self.employer_salary_count)
 
     def get_total_expenditure(self, obj):
-        return format_ballpark_number(self.employer_payroll['base_pay'] + self.employer_payroll['extra_pay'])
+        return format_ballpark_number(self.employer_pay_summary['base_pay'] + self.employer_pay_summary['extra_pay'])
 
     def get_employee_salary_json(self, obj):
         if self.employer_salary_count > 0:
             return self.bin_salary_data(
-                list(s['total_pay'] for s in self.employer_salaries.values('total_pay'))
+                self.employer_salaries.annotate(binned_pay=Cast('total_pay', FloatField()))
+                                      .values_list('binned_pay', flat=True)
+                                      .iterator(chunk_size=2000)
             )
         else:
             return []
@@ -226,16 +182,16 @@ class EmployerSerializer(serializers.ModelSerializer, ChartHelperMixin):
     def get_payroll_expenditure(self, obj):
         return {
             'container': 'payroll-expenditure-chart',
-            'total_pay': self.employer_payroll['base_pay'] + self.employer_payroll['extra_pay'],
+            'total_pay': self.employer_pay_summary['base_pay'] + self.employer_pay_summary['extra_pay'],
             'series_data': {
                 'Name': 'Data',
                 'data': [{
                     'name': 'Reported Base Pay',
-                    'y': self.employer_payroll['base_pay'],
+                    'y': self.employer_pay_summary['base_pay'],
                     'label': 'base_pay',
                 }, {
                     'name': 'Reported Extra Pay',
-                    'y': self.employer_payroll['extra_pay'],
+                    'y': self.employer_pay_summary['extra_pay'],
                     'label': 'extra_pay',
                 }],
             },
@@ -268,7 +224,8 @@ class UnitSerializer(EmployerSerializer):
                     employer.name,
                     employer.slug,
                     salary.amount,
-                    salary.extra_pay
+                    salary.extra_pay,
+                    salary.total_pay
                   FROM payroll_salary AS salary
                   JOIN payroll_job AS job
                   ON salary.job_id = job.id
@@ -278,10 +235,8 @@ class UnitSerializer(EmployerSerializer):
                   ON position.employer_id = employer.id
                   JOIN data_import_upload AS vintage
                   ON salary.vintage_id = vintage.id
-                  JOIN data_import_standardizedfile AS s_file
-                  ON s_file.upload_id = vintage.id
-                  WHERE employer.parent_id = {parent_id}
-                  AND s_file.reporting_year = {reporting_year}
+                  WHERE employer.parent_id = %(parent_id)s
+                  AND vintage.reporting_year = %(reporting_year)s
                 )
                 SELECT
                   id,
@@ -289,19 +244,23 @@ class UnitSerializer(EmployerSerializer):
                   slug,
                   SUM(COALESCE(amount, 0)) AS entity_bp,
                   SUM(COALESCE(extra_pay, 0)) AS entity_ep,
-                  SUM(COALESCE(amount, 0)) + SUM(COALESCE(extra_pay, 0)) AS total_expenditure,
+                  SUM(total_pay) AS total_expenditure,
                   percentile_cont(0.5) within GROUP (
                     ORDER BY
-                      NULLIF((COALESCE(amount, 0) + COALESCE(extra_pay, 0)), 0)
+                      NULLIF(total_pay, 0)
                   ) AS median_tp,
                   COUNT(*) AS headcount
                 FROM department_salaries
                 GROUP BY id, name, slug
                 ORDER BY total_expenditure DESC
-            '''.format(parent_id=self.instance.id,
-                       reporting_year=self.context['data_year'])
+            '''
+
+            params = {
+                'parent_id': self.instance.id,
+                'reporting_year': self.context['data_year'],
+            }
 
-            self._department_statistics = Employer.objects.raw(aggregate_query)
+            self._department_statistics = Employer.objects.raw(aggregate_query, params)
 
         return self._department_statistics
 
@@ -312,16 +271,16 @@ class UnitSerializer(EmployerSerializer):
         query = '''
             WITH employer_median_salaries_by_unit AS (
               SELECT
-                COALESCE(employer_parent_id, employer_id) AS unit_id,
+                unit_id,
                 percentile_cont(0.5) WITHIN GROUP (
                   ORDER BY total_pay ASC
                 ) AS median_salary
               FROM payroll_employer_highest_salaries
-              WHERE COALESCE(employer_parent_id, employer_id) IN (
-                SELECT id FROM payroll_employer WHERE taxonomy_id = {taxonomy}
+              WHERE unit_id IN (
+                SELECT id FROM payroll_employer WHERE taxonomy_id = %(taxonomy)s
               )
-              AND reporting_year = {reporting_year}
-              GROUP BY COALESCE(employer_parent_id, employer_id)
+              AND reporting_year = %(reporting_year)s
+              GROUP BY unit_id
             ),
             salary_percentiles AS (
               SELECT
@@ -332,13 +291,17 @@ class UnitSerializer(EmployerSerializer):
             SELECT
               percentile
             FROM salary_percentiles
-            WHERE unit_id = {id}
-        '''.format(taxonomy=obj.taxonomy.id,
-                   reporting_year=self.context['data_year'],
-                   id=obj.id)
+            WHERE unit_id = %(id)s
+        '''
 
-        with connection.cursor() as cursor:
-            cursor.execute(query)
+        params = {
+            'taxonomy': obj.taxonomy_id,
+            'reporting_year': self.context['data_year'],
+            'id': obj.id,
+        }
+
+        with read_connection().cursor() as cursor:
+            cursor.execute(query, params)
             result = cursor.fetchone()
 
         return format_percentile(result[0] * 100)
@@ -350,14 +313,14 @@ class UnitSerializer(EmployerSerializer):
         query = '''
             WITH expenditure_by_unit AS (
               SELECT
-                COALESCE(employer_parent_id, employer_id) AS unit_id,
+                unit_id,
                 SUM(total_pay) AS total_budget
               FROM payroll_employer_highest_salaries
-              WHERE COALESCE(employer_parent_id, employer_id) IN (
-                SELECT id FROM payroll_employer WHERE taxonomy_id = {taxonomy}
+              WHERE unit_id IN (
+                SELECT id FROM payroll_employer WHERE taxonomy_id = %(taxonomy)s
               )
-              AND reporting_year = {reporting_year}
-              GROUP BY COALESCE(employer_parent_id, employer_id)
+              AND reporting_year = %(reporting_year)s
+              GROUP BY unit_id
             ),
             exp_percentiles AS (
               SELECT
@@ -368,13 +331,17 @@ class UnitSerializer(EmployerSerializer):
             SELECT
               percentile
             FROM exp_percentiles
-            WHERE unit_id = {id}
-        '''.format(taxonomy=obj.taxonomy.id,
-                   reporting_year=self.context['data_year'],
-                   id=obj.id)
+            WHERE unit_id = %(id)s
+        '''
 
-        with connection.cursor() as cursor:
-            cursor.execute(query)
+        params = {
+            'taxonomy': obj.taxonomy_id,
+            'reporting_year': self.context['data_year'],
+            'id': obj.id,
+        }
+
+        with read_connection().cursor() as cursor:
+            cursor.execute(query, params)
             result = cursor.fetchone()
 
         return format_percentile(result[0] * 100)
@@ -413,7 +380,7 @@ class UnitSerializer(EmployerSerializer):
         composition_json = []
         percentage_tracker = 0
 
-        budget = self.employer_payroll['base_pay'] + self.employer_payroll['extra_pay']
+        budget = self.employer_pay_summary['base_pay'] + self.employer_pay_summary['extra_pay']
 
         for i, value in enumerate(top_departments):
             proportion = (value.total_expenditure / budget) * 100
@@ -456,26 +423,20 @@ class DepartmentSerializer(EmployerSerializer):
             return 'N/A'
 
         query = '''
-            WITH taxonomy_members AS (
+            WITH expenditure_by_department AS (
               SELECT
-                department.id,
-                department.universe_id
-              FROM payroll_employer AS unit
+                SUM(salary.total_pay) AS total_budget,
+                salary.employer_id AS department_id
+              FROM payroll_employer_highest_salaries AS salary
+              JOIN payroll_employer AS unit
+              ON salary.unit_id = unit.id
               JOIN payroll_employer AS department
-              ON unit.id = department.parent_id
-              WHERE unit.taxonomy_id = {taxonomy}
-              AND department.universe_id = {universe}
-            ),
-            expenditure_by_department AS (
-              SELECT
-                SUM(total_pay) AS total_budget,
-                employer_id AS department_id
-              FROM payroll_employer_highest_salaries
-              WHERE employer_id IN (
-                SELECT id FROM taxonomy_members
-              )
-              AND reporting_year = {reporting_year}
-              GROUP BY employer_id
+              ON salary.employer_id = department.id
+              WHERE salary.employer_parent_id IS NOT NULL
+              AND unit.taxonomy_id = %(taxonomy)s
+              AND department.universe_id = %(universe)s
+              AND salary.reporting_year = %(reporting_year)s
+              GROUP BY salary.employer_id
             ),
             exp_percentiles AS (
               SELECT
@@ -486,14 +447,18 @@ class DepartmentSerializer(EmployerSerializer):
             SELECT
               percentile
             FROM exp_percentiles
-            WHERE department_id = {id}
-        '''.format(taxonomy=obj.parent.taxonomy.id,
-                   universe=obj.universe.id,
-                   id=obj.id,
-                   reporting_year=self.context['data_year'])
-
-        with connection.cursor() as cursor:
-            cursor.execute(query)
+            WHERE department_id = %(id)s
+        '''
+
+        params = {
+            'taxonomy': obj.parent.taxonomy_id,
+            'universe': obj.universe_id,
+            'id': obj.id,
+            'reporting_year': self.context['data_year'],
+        }
+
+        with read_connection().cursor() as cursor:
+            cursor.execute(query, params)
             result = cursor.fetchone()
 
         return format_percentile(result[0] * 100)
@@ -503,28 +468,22 @@ class DepartmentSerializer(EmployerSerializer):
             return 'N/A'
 
         query = '''
-            WITH taxonomy_members AS (
-              SELECT
-                department.id,
-                department.universe_id
-              FROM payroll_employer AS unit
-              JOIN payroll_employer AS department
-              ON unit.id = department.parent_id
-              WHERE unit.taxonomy_id = {taxonomy}
-              AND department.universe_id = {universe}
-            ),
-            median_salaries_by_department AS (
+            WITH median_salaries_by_department AS (
               SELECT
                 percentile_cont(0.5) WITHIN GROUP (
-                  ORDER BY total_pay ASC
+                  ORDER BY salary.total_pay ASC
                 ) AS median_salary,
-                employer_id AS department_id
-              FROM payroll_employer_highest_salaries
-              WHERE employer_id IN (
-                SELECT id FROM taxonomy_members
-              )
-              AND reporting_year = {reporting_year}
-              GROUP BY employer_id
+                salary.employer_id AS department_id
+              FROM payroll_employer_highest_salaries AS salary
+              JOIN payroll_employer AS unit
+              ON salary.unit_id = unit.id
+              JOIN payroll_employer AS department
+              ON salary.employer_id = department.id
+              WHERE salary.employer_parent_id IS NOT NULL
+              AND unit.taxonomy_id = %(taxonomy)s
+              AND department.universe_id = %(universe)s
+              AND salary.reporting_year = %(reporting_year)s
+              GROUP BY salary.employer_id
             ),
             salary_percentiles AS (
               SELECT
@@ -534,14 +493,18 @@ class DepartmentSerializer(EmployerSerializer):
             )
             SELECT percentile
             FROM salary_percentiles
-            WHERE department_id = {id}
-            '''.format(taxonomy=obj.parent.taxonomy.id,
-                       universe=obj.universe.id,
-                       id=obj.id,
-                       reporting_year=self.context['data_year'])
-
-        with connection.cursor() as cursor:
-            cursor.execute(query)
+            WHERE department_id = %(id)s
+            '''
+
+        params = {
+            'taxonomy': obj.parent.taxonomy_id,
+            'universe': obj.universe_id,
+            'id': obj.id,
+            'reporting_year': self.context['data_year'],
+        }
+
+        with read_connection().cursor() as cursor:
+            cursor.execute(query, params)
             result = cursor.fetchone()
 
         return format_percentile(result[0] * 100)
@@ -588,7 +551,7 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
     def person_current_salary(self):
         if not hasattr(self, '_current_salary'):
             self._current_salary = self.person_current_job.salaries.get(
-                vintage__standardized_file__reporting_year=self.context['data_year']
+                vintage__reporting_year=self.context['data_year']
             )
         return self._current_salary
 
@@ -616,8 +579,8 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
 
         for salary in Salary.objects.with_related_objects()\
                                     .filter(job__person=obj)\
-                                    .annotate(data_year=Max('vintage__standardized_file__reporting_year'))\
-                                    .order_by('-vintage__standardized_file__reporting_year'):
+                                    .annotate(data_year=F('vintage__reporting_year'))\
+                                    .order_by('-data_year'):
 
             data.append({
                 'position': salary.job.position.title,
@@ -657,14 +620,17 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
         if self.person_current_employer.is_unclassified:
             return None
         elif self.person_current_employer.is_department:
-            return [str(self.person_current_employer.universe), str(self.person_current_employer.parent.taxonomy)]
+            return [str(get_universe(self.person_current_employer.universe_id)),
+                    str(get_taxonomy(self.person_current_employer.parent.taxonomy_id))]
         else:
-            return [str(self.person_current_employer.taxonomy)]
+            return [str(get_taxonomy(self.person_current_employer.taxonomy_id))]
 
     def get_employer_salary_json(self, obj):
         return self.bin_salary_data(
             self.person_current_employer.get_salaries(self.context['data_year'])
-                                        .values_list('total_pay', flat=True),
+                                        .annotate(binned_pay=Cast('total_pay', FloatField()))
+                                        .values_list('binned_pay', flat=True)
+                                        .iterator(chunk_size=2000),
             salary_amount=self.person_current_salary.total_pay
         )
 
@@ -679,7 +645,7 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
 
         for salary in Salary.objects.with_related_objects()\
                                     .filter(job__position=self.person_current_job.position,
-                                            vintage__standardized_file__reporting_year=self.context['data_year'])\
+                                            vintage__reporting_year=self.context['data_year'])\
                                     .exclude(job__person=obj)\
                                     .order_by('-total_pay')[:25]:
 
@@ -700,8 +666,7 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
             return source_file.url
 
     def get_noindex(self, obj):
-        total_pay = (self.person_current_salary.amount or 0) + (self.person_current_salary.extra_pay or 0)
-        return total_pay < 30000 or obj.noindex
+        return self.person_current_salary.total_pay < 30000 or obj.noindex
 
     def get_employee_salary_json(self, obj):
         base_pay = {
@@ -715,8 +680,8 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
 
         for salary in Salary.objects.with_related_objects()\
                                     .filter(job__person=obj)\
-                                    .annotate(data_year=Max('vintage__standardized_file__reporting_year'))\
-                                    .order_by('vintage__standardized_file__reporting_year'):
+                                    .annotate(data_year=F('vintage__reporting_year'))\
+                                    .order_by('data_year'):
 
             base_pay['data'].append({
                 'name': str(salary.data_year),
@@ -744,7 +709,7 @@ class PersonSerializer(serializers.ModelSerializer, ChartHelperMixin):
         current_salary = self.person_current_salary
 
         ordered_salaries = list(Salary.objects.filter(job__person=obj)
-                                              .order_by('vintage__standardized_file__reporting_year'))
+                                              .order_by('vintage__reporting_year'))
 
         first_salary = ordered_salaries[0]
 
@@ -0,0 +1,24 @@
+from __future__ import absolute_import, unicode_literals
+
+from io import StringIO
+
+from celery import shared_task
+from django.core.management import call_command
+
+
+@shared_task
+def reindex_employer(*, employer_id):
+    '''
+    Rebuild the search index documents for a single employer. Run outside
+    of the request cycle, so saving an employer in the admin does not wait
+    on Solr.
+    '''
+    io_out = StringIO()
+
+    call_command(
+        'build_solr_index',
+        employer=employer_id,
+        stdout=io_out
+    )
+
+    return io_out.getvalue()
@@ -22,6 +22,7 @@ from bga_database.local_settings import CACHE_SECRET_KEY
 
 from data_import.models import StandardizedFile
 
+from payroll.cache import clear_process_cache
 from payroll.charts import ChartHelperMixin
 from payroll.models import Person, Unit, Department, Employer
 from payroll.search import PayrollSearchMixin, FacetingMixin, \
@@ -103,6 +104,9 @@ class RedirectDispatchMixin:
 class EmployerView(RedirectDispatchMixin, DetailView, ChartHelperMixin):
     context_object_name = 'entity'
 
+    def get_queryset(self):
+        return self.model.objects.for_display()
+
 
 class UnitView(EmployerView):
     model = Unit
@@ -139,8 +143,8 @@ class DepartmentView(EmployerView):
 
     def data_years(self):
         data_years = self.object.get_salaries()\
-            .distinct('vintage__standardized_file__reporting_year')\
-            .values_list('vintage__standardized_file__reporting_year', flat=True)
+            .distinct('vintage__reporting_year')\
+            .values_list('vintage__reporting_year', flat=True)
 
         return sorted(list(data_years), reverse=True)
 
@@ -160,7 +164,7 @@ class PersonView(RedirectDispatchMixin, DetailView, ChartHelperMixin):
         context = super().get_context_data(**kwargs)
 
         most_recent_year = self.object.jobs.aggregate(
-            most_recent_year=Max('salaries__vintage__standardized_file__reporting_year')
+            most_recent_year=Max('salaries__vintage__reporting_year')
         )['most_recent_year']
 
         serializer = PersonSerializer(self.object, context={
@@ -207,7 +211,7 @@ class DownloadView(TemplateView):
         dict_writer = csv.DictWriter(f=buffer, fieldnames=headers)
 
         def row_generator():
-            for salary in employer_salaries:
+            for salary in employer_salaries.iterator(chunk_size=2000):
                 name_kwargs = {
                     'first_name': salary.job.person.first_name,
                     'last_name': salary.job.person.last_name
@@ -410,6 +414,8 @@ def flush_cache(request, secret_key):
         for cache_label in settings.CACHES.keys():
             caches[cache_label].clear()
 
+        clear_process_cache()
+
         status_code = 200
     else:
         status_code = 403
@@ -1,5 +1,6 @@
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 
 from data_import.models import RespondingAgencyAlias
 from payroll.models import EmployerAlias
@@ -49,7 +50,7 @@ def test_department_unique_alias(employer):
     department = employer.build(parent=unit, name='a_dept')
     EmployerAlias.objects.create(employer=department, name='a_rose')
 
-    with pytest.raises(ValidationError):
+    with pytest.raises(IntegrityError):
         EmployerAlias.objects.create(employer=department, name='a_rose')
 
 
@@ -72,7 +73,7 @@ def test_unit_unique_alias(employer):
     unit = employer.build()
     EmployerAlias.objects.create(employer=unit, name='a_rose')
 
-    with pytest.raises(ValidationError):
+    with pytest.raises(IntegrityError):
         EmployerAlias.objects.create(employer=unit, name='a_rose')
 
 
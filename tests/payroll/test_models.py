@@ -1,5 +1,13 @@
 import pytest
+from django.conf import settings
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+
+from data_import.models import StandardizedFile
+from payroll.cache import clear_process_cache, get_taxonomy
+from payroll.models import Employer, EmployerPaySummary, EmployerPopulation, \
+    EmployerTaxonomy, Salary, Unit, UnitRespondingAgency
 
 
 @pytest.mark.django_db
@@ -20,3 +28,218 @@ def test_null_salary_extra_pay(salary):
     s = salary.build(extra_pay=None)
 
     assert s.amount == '25000'
+
+
+@pytest.mark.django_db
+def test_employer_size_class(employer, employer_taxonomy):
+    unit = employer.build()
+    unit.taxonomy = employer_taxonomy.build(entity_type='Municipal', chicago=False)
+    unit.save()
+
+    EmployerPopulation.objects.create(employer=unit, population=20000, data_year=settings.DATA_YEAR)
+    EmployerPopulation.update_size_class(employer_ids=[unit.id])
+
+    assert unit.size_class == 'Medium'
+
+
+@pytest.mark.django_db
+def test_employer_population_closest_for(employer):
+    unit = employer.build()
+
+    for offset, population in ((-3, 100), (1, 200), (-1, 300)):
+        EmployerPopulation.objects.create(employer=unit,
+                                          population=population,
+                                          data_year=settings.DATA_YEAR + offset)
+
+    closest = EmployerPopulation.closest_for([unit.id])
+
+    # Ties go to the more recent population.
+    assert closest[unit.id].population == 200 == unit.get_population()
+
+    closest = EmployerPopulation.closest_for([unit.id], year=settings.DATA_YEAR - 3)
+
+    assert closest[unit.id].population == 100
+
+
+@pytest.mark.django_db
+def test_employer_get_population(employer):
+    unit = employer.build()
+
+    for offset, population in ((-2, 100), (5, 200)):
+        EmployerPopulation.objects.create(employer=unit,
+                                          population=population,
+                                          data_year=settings.DATA_YEAR + offset)
+
+    # Pick the population closest to the target year, in either direction.
+    assert unit.get_population(year=settings.DATA_YEAR) == 100
+
+    # The closest population is only fetched once per target year.
+    with CaptureQueriesContext(connection) as queries:
+        assert unit.get_population(year=settings.DATA_YEAR) == 100
+
+    assert len(queries.captured_queries) == 0
+
+    with CaptureQueriesContext(connection) as queries:
+        assert unit.get_population(year=settings.DATA_YEAR + 4) == 200
+
+    assert len(queries.captured_queries) == 1
+
+    # Prefetched populations don't need another query.
+    unit = Employer.objects.prefetch_related('population').get(id=unit.id)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert unit.get_population(year=settings.DATA_YEAR) == 100
+
+    assert len(queries.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_salary_employer_percentile(salary):
+    lower = salary.build(amount='20000', extra_pay=None)
+    higher = Salary.objects.create(job=lower.job, amount='30000', vintage=lower.vintage)
+    middle = Salary.objects.create(job=lower.job, amount='25000', vintage=lower.vintage)
+
+    assert lower.employer_percentile == 0
+    assert middle.employer_percentile == 50
+    assert higher.employer_percentile == 100
+
+
+@pytest.mark.django_db
+def test_salary_total_pay_trigger(salary):
+    s = salary.build(amount='25000', extra_pay='2500')
+
+    # Imports write salaries with raw SQL, which skips Salary.save, so the
+    # database must keep total pay up to date on its own.
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            INSERT INTO payroll_salary (job_id, vintage_id, amount, extra_pay)
+            SELECT job_id, vintage_id, 30000, NULL
+            FROM payroll_salary
+            WHERE id = %s
+            RETURNING id
+        ''', [s.id])
+
+        inserted_id, = cursor.fetchone()
+
+        cursor.execute('UPDATE payroll_salary SET extra_pay = NULL WHERE id = %s', [s.id])
+
+    assert Salary.objects.get(id=inserted_id).total_pay == 30000
+    assert Salary.objects.get(id=s.id).total_pay == 25000
+
+
+@pytest.mark.django_db
+def test_job_most_recent_year(salary, standardized_file):
+    current = salary.build()
+    job = current.job
+
+    previous_upload = standardized_file.build(reporting_year=settings.DATA_YEAR - 1).upload
+    Salary.objects.create(job=job, amount='20000', vintage=previous_upload)
+
+    job.refresh_from_db()
+
+    assert job.most_recent_year == settings.DATA_YEAR
+
+    # Amending an import deletes the salaries of its year.
+    Salary.objects.filter(vintage=current.vintage).delete()
+
+    job.refresh_from_db()
+
+    assert job.most_recent_year == settings.DATA_YEAR - 1
+    assert job.person.most_recent_job == job
+
+    Salary.objects.filter(job=job).delete()
+
+    job.refresh_from_db()
+
+    assert job.most_recent_year is None
+
+
+@pytest.mark.django_db
+def test_employer_pay_summary(employer, position, job, salary):
+    unit = employer.build()
+    department = employer.build(parent=unit, name='Brewing')
+
+    salary.build(job=job.build(position=position.build(employer=unit)),
+                 amount='25000',
+                 extra_pay='2500')
+    salary.build(job=job.build(position=position.build(employer=department)),
+                 amount='30000',
+                 extra_pay=None)
+
+    EmployerPaySummary.refresh()
+
+    # Units include the salaries of their departments.
+    unit_summary = EmployerPaySummary.for_employer(unit.id, settings.DATA_YEAR)
+
+    assert unit_summary['headcount'] == 2
+    assert unit_summary['base_pay'] == 55000
+    assert unit_summary['extra_pay'] == 2500
+    assert unit_summary['median_total_pay'] == 28750
+
+    department_summary = EmployerPaySummary.for_employer(department.id, settings.DATA_YEAR)
+
+    assert department_summary['headcount'] == 1
+    assert department_summary['base_pay'] + department_summary['extra_pay'] == 30000
+
+    # Employers without salaries in a year get an empty summary.
+    assert EmployerPaySummary.for_employer(unit.id, settings.DATA_YEAR - 1)['headcount'] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_employer_pay_summary_after_delete(employer, position, job, salary, standardized_file, monkeypatch):
+    unit = employer.build()
+    s_file = standardized_file.build()
+
+    salary.build(job=job.build(position=position.build(employer=unit)),
+                 vintage=s_file.upload)
+
+    EmployerPaySummary.refresh()
+
+    assert EmployerPaySummary.for_employer(unit.id, settings.DATA_YEAR)['headcount'] == 1
+
+    # There is no worker to inspect for running tasks.
+    monkeypatch.setattr(StandardizedFile, 'get_task', lambda self: None)
+
+    # Deleting the standardized file deletes its upload and salaries, and
+    # refreshes the views derived from them.
+    s_file.delete()
+
+    assert not Salary.objects.exists()
+    assert EmployerPaySummary.for_employer(unit.id, settings.DATA_YEAR)['headcount'] == 0
+
+
+@pytest.mark.django_db
+def test_unit_responding_agency(employer, responding_agency):
+    unit = employer.build()
+    department = employer.build(parent=unit, name='Brewing')
+
+    agency = unit.responding_agency(settings.DATA_YEAR)
+
+    assert department.responding_agency(settings.DATA_YEAR) == agency
+
+    # A second agency for the same unit and year is ambiguous.
+    UnitRespondingAgency.objects.create(unit=unit,
+                                        responding_agency=responding_agency.build(name='Pipeworks'),
+                                        reporting_year=settings.DATA_YEAR)
+
+    with pytest.raises(UnitRespondingAgency.MultipleObjectsReturned):
+        Unit.objects.get(id=unit.id).responding_agency(settings.DATA_YEAR)
+
+
+@pytest.mark.django_db
+def test_taxonomy_process_cache(employer_taxonomy, monkeypatch):
+    clear_process_cache()
+
+    taxonomy = employer_taxonomy.build()
+
+    assert get_taxonomy(taxonomy.id).entity_type == 'Brewery'
+
+    # Queryset updates do not send signals, as with changes made by another
+    # process, so the cached taxonomy is stale until it expires.
+    EmployerTaxonomy.objects.filter(id=taxonomy.id).update(entity_type='Distillery')
+
+    assert get_taxonomy(taxonomy.id).entity_type == 'Brewery'
+
+    monkeypatch.setattr('payroll.cache.PROCESS_CACHE_TIMEOUT', -1)
+
+    assert get_taxonomy(taxonomy.id).entity_type == 'Distillery'
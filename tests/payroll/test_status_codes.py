@@ -1,5 +1,9 @@
 import pytest
 
+from django.conf import settings
+from django.test import override_settings
+
+from payroll.cache import bump_data_version
 from payroll.models import Employer, Person
 
 
@@ -64,3 +68,55 @@ def test_person(salary, client, transactional_db):
     rv = client.get('/people/{}/'.format(p.slug))
 
     assert rv.status_code == 200
+
+
+# The data version behind ETags is kept in the default cache, which is a
+# dummy cache in the test settings.
+@override_settings(CACHES=dict(settings.CACHES, default={
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}))
+@pytest.mark.django_db(transaction=True)
+def test_api_etag(salary, client, transactional_db):
+    salary.build()
+
+    p = Person.objects.first()
+
+    url = '/people/{0}/?data_year={1}'.format(p.slug, settings.DATA_YEAR)
+
+    rv = client.get(url)
+
+    assert rv.status_code == 200
+    assert rv['ETag']
+
+    etag = rv['ETag']
+
+    rv = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert rv.status_code == 304
+
+    # Changing the data, e.g., finishing an import, invalidates the ETag.
+    bump_data_version()
+
+    rv = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    assert rv.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_etag_without_cache(salary, client, transactional_db):
+    salary.build()
+
+    p = Person.objects.first()
+
+    url = '/people/{0}/?data_year={1}'.format(p.slug, settings.DATA_YEAR)
+
+    # The dummy cache cannot hold a data version, so no ETag is sent, rather
+    # than one that never changes.
+    rv = client.get(url)
+
+    assert rv.status_code == 200
+    assert 'ETag' not in rv
+
+    rv = client.get(url, HTTP_IF_NONE_MATCH='"{}"'.format('0' * 40))
+
+    assert rv.status_code == 200